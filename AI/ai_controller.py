@@ -1,3 +1,4 @@
+import os
 import threading
 import logging
 from gui.dataset_generation_gui import DatasetGenerationGUI
@@ -7,6 +8,12 @@ from generate_data import generate_data_for_all_emotions
 BASE_DATASET_PATH = "/home/ivy/Documents/portfolio/hand_tracking/AI/data_sets/AffectNet"
 OUTPUT_PATH = "/home/ivy/Documents/portfolio/hand_tracking/AI/generated_data"
 
+# Number of processes extracting landmarks; 1 disables the process pool
+NUM_WORKERS = os.cpu_count() or 1
+
+# "csv" for text output, "binary" for memory-mappable float32 files
+OUTPUT_FORMAT = "csv"
+
 class AIController:
     def __init__(self):
         self.gui = DatasetGenerationGUI(
@@ -58,7 +65,9 @@ class AIController:
         Run the generation process using generate_data.py
         """
         try:
-            generate_data_for_all_emotions(BASE_DATASET_PATH, OUTPUT_PATH)
+            generate_data_for_all_emotions(
+                BASE_DATASET_PATH, OUTPUT_PATH, NUM_WORKERS, OUTPUT_FORMAT
+            )
             self.gui.update_log("Dataset generation completed successfully!")
         except Exception as e:
             self.gui.update_log(f"Error during dataset generation: {e}")
@@ -1,16 +1,22 @@
 import os
+import threading
+import collections
+from concurrent.futures import ThreadPoolExecutor
 import cv2
 import mediapipe as mp
-import matplotlib.pyplot as plt
 
 # Initialize Mediapipe Face Mesh
 mp_face_mesh = mp.solutions.face_mesh
 mp_drawing = mp.solutions.drawing_utils
 
-# Initialize the Mediapipe face mesh instance
-face_mesh = mp_face_mesh.FaceMesh(
-    static_image_mode=True, max_num_faces=1, min_detection_confidence=0.5
-)
+# Mediapipe face mesh instance, created on first use by get_face_mesh
+face_mesh = None
+
+# Memory budget for rendered images kept by the navigator
+CACHE_MAX_BYTES = 256 * 1024 * 1024
+
+# Number of images rendered ahead in the browsing direction
+PREFETCH_COUNT = 3
 
 
 def get_image_files(folder_path):
@@ -36,6 +42,19 @@ def load_affectnet_image(image_path):
     return cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
 
 
+def get_face_mesh():
+    """
+    Returns the module's face mesh instance, creating it on first use so importing
+    this module does not load the model.
+    """
+    global face_mesh
+    if face_mesh is None:
+        face_mesh = mp_face_mesh.FaceMesh(
+            static_image_mode=True, max_num_faces=1, min_detection_confidence=0.5
+        )
+    return face_mesh
+
+
 def apply_face_mesh(image):
     """
     Apply Mediapipe face mesh on the input image.
@@ -44,7 +63,7 @@ def apply_face_mesh(image):
     image_rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
 
     # Process the image to extract face landmarks
-    results = face_mesh.process(image_rgb)
+    results = get_face_mesh().process(image_rgb)
 
     if results.multi_face_landmarks:
         for face_landmarks in results.multi_face_landmarks:
@@ -61,32 +80,123 @@ def apply_face_mesh(image):
     return image
 
 
-def visualize_affectnet_image_with_mesh(image_path):
+def render_affectnet_image_with_mesh(image_path):
     """
-    Load an image from AffectNet, apply the Mediapipe face mesh, and display the results.
+    Load an image from AffectNet and apply the Mediapipe face mesh.
+    :return: The BGR image with the mesh drawn, or None if it could not be loaded.
     """
     # Load the image
     image = load_affectnet_image(image_path)
 
     if image is None:
-        return
+        return None
 
     # Apply Mediapipe face mesh to the image
     image_with_mesh = apply_face_mesh(image)
 
     # Convert the image back to BGR for OpenCV display
-    image_bgr = cv2.cvtColor(image_with_mesh, cv2.COLOR_RGB2BGR)
+    return cv2.cvtColor(image_with_mesh, cv2.COLOR_RGB2BGR)
+
+
+def visualize_affectnet_image_with_mesh(image_path):
+    """
+    Load an image from AffectNet, apply the Mediapipe face mesh, and display the results.
+    """
+    image_bgr = render_affectnet_image_with_mesh(image_path)
+
+    if image_bgr is None:
+        return
 
     # Plot the result
     cv2.imshow("AffectNet Image with Mesh", image_bgr)
 
 
+class RenderedImageCache:
+    """
+    LRU cache of images rendered with their face mesh, bounded by total bytes.
+
+    Rendering happens on a single background thread, which owns the module's face
+    mesh instance, so images ahead in the browsing direction can be prefetched
+    while the current one is on screen.
+    """
+
+    def __init__(self, max_bytes=CACHE_MAX_BYTES):
+        self._max_bytes = max_bytes
+        self._images = collections.OrderedDict()  # Image path -> rendered image
+        self._bytes = 0
+        self._pending = {}  # Image path -> future of a render in progress
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=1)
+
+    def _render(self, image_path):
+        image = None
+        try:
+            image = render_affectnet_image_with_mesh(image_path)
+        finally:
+            # Forget the render even if it failed, so the next get retries it
+            with self._lock:
+                self._pending.pop(image_path, None)
+                if image is not None:
+                    self._put(image_path, image)
+        return image
+
+    def _put(self, image_path, image):
+        if image_path in self._images:
+            return
+        self._images[image_path] = image
+        self._bytes += image.nbytes
+
+        # Evict the least recently used images until within budget
+        while self._bytes > self._max_bytes and len(self._images) > 1:
+            _, evicted = self._images.popitem(last=False)
+            self._bytes -= evicted.nbytes
+
+    def _submit(self, image_path):
+        # Must be called with the lock held
+        future = self._pending.get(image_path)
+        if future is None:
+            future = self._executor.submit(self._render, image_path)
+            self._pending[image_path] = future
+        return future
+
+    def get(self, image_path):
+        """
+        Returns the rendered image, waiting for it to be rendered if needed.
+        :return: The BGR image with the mesh drawn, or None if it could not be loaded.
+        """
+        with self._lock:
+            if image_path in self._images:
+                self._images.move_to_end(image_path)
+                return self._images[image_path]
+            future = self._submit(image_path)
+        return future.result()
+
+    def prefetch(self, image_paths):
+        """
+        Queues images for background rendering, cancelling prefetches that are no
+        longer wanted and have not started yet.
+        :param image_paths: Paths to render, in order of priority.
+        """
+        with self._lock:
+            for image_path, future in list(self._pending.items()):
+                if image_path not in image_paths and future.cancel():
+                    del self._pending[image_path]
+            for image_path in image_paths:
+                if image_path not in self._images:
+                    self._submit(image_path)
+
+    def close(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
 def image_navigator(folder_path):
     """
     Navigate through the images in the folder with 'n' for next and 'p' for previous.
     """
     image_files = get_image_files(folder_path)
     current_idx = 0
+    direction = 1
+    cache = RenderedImageCache()
 
     while True:
         if current_idx < 0:
@@ -99,27 +209,45 @@ def image_navigator(folder_path):
         print(f"Displaying {image_files[current_idx]}")
 
         # Visualize the current image
-        visualize_affectnet_image_with_mesh(image_path)
+        image_bgr = cache.get(image_path)
+        if image_bgr is not None:
+            cv2.imshow("AffectNet Image with Mesh", image_bgr)
+
+        # Render the next few images in the browsing direction in the background
+        prefetch_indices = [
+            current_idx + direction * step for step in range(1, PREFETCH_COUNT + 1)
+        ]
+        cache.prefetch(
+            [
+                os.path.join(folder_path, image_files[idx])
+                for idx in prefetch_indices
+                if 0 <= idx < len(image_files)
+            ]
+        )
 
         # Wait for user input
         key = cv2.waitKey(0) & 0xFF
 
         if key == ord("n"):
             current_idx += 1
+            direction = 1
         elif key == ord("p"):
             current_idx -= 1
+            direction = -1
         elif key == ord("q"):
             print("Exiting.")
+            cache.close()
             break
 
         # Close all OpenCV windows
         cv2.destroyAllWindows()
 
 
-# Path to the AffectNet dataset folder (adjust this path to your dataset)
-affectnet_path = (
-    "/home/ivy/Documents/portfolio/hand_tracking/data_sets/AffectNet/train/0/"
-)
+if __name__ == "__main__":
+    # Path to the AffectNet dataset folder (adjust this path to your dataset)
+    affectnet_path = (
+        "/home/ivy/Documents/portfolio/hand_tracking/data_sets/AffectNet/train/0/"
+    )
 
-# Start navigating through images
-image_navigator(affectnet_path)
+    # Start navigating through images
+    image_navigator(affectnet_path)
@@ -0,0 +1,204 @@
+import os
+import json
+import logging
+
+# One manifest per output format, since each format has its own output files
+MANIFEST_FILENAME = "extraction_manifest_{output_format}.jsonl"
+
+# Bytes copied at a time when dropping superseded rows from an output file
+COPY_CHUNK_SIZE = 1 << 20
+
+
+class ExtractionManifest:
+    """
+    Records which images have already been processed for an output directory, keyed
+    by path, size and modification time, so reruns only process new or changed images.
+
+    The manifest is an append-only JSON Lines file. Entries are appended after the
+    rows of the images they describe have been written, each with the byte range of
+    its row in the output file, followed by the length of the output the chunk
+    vouches for. Before an output is appended to again, rows written after the last
+    recorded chunk and rows of images that have since changed are dropped, so an
+    interrupted or repeated run never leaves duplicate rows.
+    """
+
+    def __init__(self, output_dir, output_format="csv"):
+        self.path = os.path.join(
+            output_dir, MANIFEST_FILENAME.format(output_format=output_format)
+        )
+        self._entries = {}  # Image path -> manifest entry
+        self._output_ends = {}  # Output file name -> recorded length in bytes
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+
+        with open(self.path, "r") as manifest_file:
+            for line in manifest_file:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    # A run interrupted mid-write can leave a partial last line
+                    logging.warning(f"Skipping corrupt manifest line in {self.path}")
+                    continue
+                if "path" in entry:
+                    self._entries[entry["path"]] = entry
+                else:
+                    self._output_ends[entry["output"]] = entry["end"]
+        logging.info(f"Loaded {len(self._entries)} entries from {self.path}")
+
+    @staticmethod
+    def image_key(image_path):
+        """
+        Returns the manifest key and file signature of an image.
+        :return: A (path, size, mtime_ns) tuple.
+        """
+        stat = os.stat(image_path)
+        return os.path.abspath(image_path), stat.st_size, stat.st_mtime_ns
+
+    def is_processed(self, image_key):
+        """
+        Checks if an image was processed and has not changed since.
+        :param image_key: A tuple returned by image_key.
+        """
+        path, size, mtime_ns = image_key
+        entry = self._entries.get(path)
+        if entry is None:
+            return False
+        return (entry["size"], entry["mtime_ns"]) == (size, mtime_ns)
+
+    def resume_output(self, output_path, image_keys):
+        """
+        Prepares an output file for appending: truncates rows written after the last
+        recorded chunk, and drops the rows of images that changed since they were
+        recorded, so reprocessing them does not leave a stale duplicate.
+        :param output_path: Path of the output file.
+        :param image_keys: Tuples returned by image_key for the images of the output.
+        """
+        output = os.path.basename(output_path)
+        end = self._output_ends.get(output)
+        if end is None:
+            # Nothing recorded for this output yet, or it predates row ranges
+            return
+
+        output_size = 0
+        if os.path.exists(output_path):
+            output_size = os.path.getsize(output_path)
+        if output_size < end:
+            # Rows the manifest vouches for are gone, so redo the output from scratch
+            logging.warning(f"{output_path} is shorter than recorded, rebuilding it")
+            if os.path.exists(output_path):
+                os.truncate(output_path, 0)
+            self._forget_output(output)
+            self._rewrite()
+            return
+
+        stale_ranges = []
+        for path, size, mtime_ns in image_keys:
+            entry = self._entries.get(path)
+            if (
+                entry is not None
+                and entry.get("output") == output
+                and (entry["size"], entry["mtime_ns"]) != (size, mtime_ns)
+            ):
+                stale_ranges.append((entry["offset"], entry["end"]))
+                del self._entries[path]
+
+        if not stale_ranges:
+            if output_size > end:
+                logging.warning(
+                    f"Truncating unrecorded rows at the end of {output_path}"
+                )
+                os.truncate(output_path, end)
+            return
+
+        logging.info(f"Dropping {len(stale_ranges)} superseded rows from {output_path}")
+        stale_ranges.sort()
+        self._drop_ranges(output_path, stale_ranges, end)
+
+        # Shift the rows that followed a dropped one back by the bytes dropped
+        for entry in self._entries.values():
+            if entry.get("output") != output:
+                continue
+            shift = sum(
+                range_end - range_start
+                for range_start, range_end in stale_ranges
+                if range_end <= entry["offset"]
+            )
+            entry["offset"] -= shift
+            entry["end"] -= shift
+        self._output_ends[output] = end - sum(
+            range_end - range_start for range_start, range_end in stale_ranges
+        )
+
+        # A crash before the manifest is replaced leaves the output shorter than
+        # recorded, which the next run detects and rebuilds from scratch
+        os.replace(output_path + ".tmp", output_path)
+        self._rewrite()
+
+    @staticmethod
+    def _drop_ranges(output_path, ranges, end):
+        # Copy the output up to end, minus the sorted byte ranges, to a .tmp file
+        with open(output_path, "rb") as source, open(
+            output_path + ".tmp", "wb"
+        ) as target:
+            position = 0
+            for drop_start, drop_end in [*ranges, (end, end)]:
+                source.seek(position)
+                remaining = drop_start - position
+                while remaining > 0:
+                    chunk = source.read(min(remaining, COPY_CHUNK_SIZE))
+                    target.write(chunk)
+                    remaining -= len(chunk)
+                position = drop_end
+            target.flush()
+            os.fsync(target.fileno())
+
+    def _forget_output(self, output):
+        self._entries = {
+            path: entry
+            for path, entry in self._entries.items()
+            if entry.get("output") != output
+        }
+        self._output_ends.pop(output, None)
+
+    def _rewrite(self):
+        # Replace the manifest with the current entries in one atomic step
+        with open(self.path + ".tmp", "w") as manifest_file:
+            for entry in self._entries.values():
+                manifest_file.write(json.dumps(entry) + "\n")
+            for output, end in self._output_ends.items():
+                manifest_file.write(json.dumps({"output": output, "end": end}) + "\n")
+            manifest_file.flush()
+            os.fsync(manifest_file.fileno())
+        os.replace(self.path + ".tmp", self.path)
+
+    def record(self, output_path, processed_images, end):
+        """
+        Appends processed images to the manifest and flushes it to disk.
+        :param output_path: Path of the output file their rows were written to.
+        :param processed_images: (image_key, offset, end) tuples of each image's key
+                                 and the byte range of its row, empty if it had none.
+        :param end: Length of the output once the rows have been flushed.
+        """
+        output = os.path.basename(output_path)
+        with open(self.path, "a") as manifest_file:
+            for (path, size, mtime_ns), row_offset, row_end in processed_images:
+                entry = {
+                    "path": path,
+                    "size": size,
+                    "mtime_ns": mtime_ns,
+                    "output": output,
+                    "offset": row_offset,
+                    "end": row_end,
+                }
+                manifest_file.write(json.dumps(entry) + "\n")
+                self._entries[path] = entry
+            manifest_file.write(json.dumps({"output": output, "end": end}) + "\n")
+            self._output_ends[output] = end
+            manifest_file.flush()
+            os.fsync(manifest_file.fileno())
+
+    def __len__(self):
+        return len(self._entries)
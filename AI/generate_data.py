@@ -1,13 +1,31 @@
 import os
 import cv2
 import mediapipe as mp
-import pandas as pd
-import datetime
 import logging
+import collections
+import multiprocessing
+from extraction_manifest import ExtractionManifest
+from landmark_writers import landmark_output_path
+from landmark_writers import open_landmark_writer
 
 # Initialize Mediapipe Face Mesh
 mp_face_mesh = mp.solutions.face_mesh
-face_mesh = mp_face_mesh.FaceMesh(static_image_mode=True, max_num_faces=1)
+
+# Face Mesh instance of the main process, created on first use by get_face_mesh so
+# importing this module (including in every spawned worker) does not load the model
+face_mesh = None
+
+# Face Mesh instance owned by each worker process, created by init_worker
+worker_face_mesh = None
+
+# Maximum number of images queued in or returned by the process pool at once
+MAX_IN_FLIGHT_IMAGES = 256
+
+# Number of images flushed to the output and recorded in the manifest at a time
+MANIFEST_CHUNK_SIZE = 500
+
+# Supported output formats: text CSV, or raw float32 rows that can be memory-mapped
+OUTPUT_FORMATS = ("csv", "binary")
 
 
 def ensure_directory_exists(directory):
@@ -22,12 +40,48 @@ def ensure_directory_exists(directory):
         logging.debug(f"Directory already exists: {directory}")
 
 
-def extract_facial_landmarks(image_path):
+def create_face_mesh():
+    """
+    Creates a Face Mesh instance configured for still images.
+    """
+    return mp_face_mesh.FaceMesh(static_image_mode=True, max_num_faces=1)
+
+
+def get_face_mesh():
+    """
+    Returns the module's Face Mesh instance, creating it on first use.
+    """
+    global face_mesh
+    if face_mesh is None:
+        face_mesh = create_face_mesh()
+    return face_mesh
+
+
+def init_worker():
+    """
+    Process pool initializer: gives each worker its own Face Mesh instance.
+    """
+    global worker_face_mesh
+    worker_face_mesh = create_face_mesh()
+
+
+def extract_facial_landmarks_in_worker(image_path):
+    """
+    Extract facial landmarks inside a pool worker using the worker's Face Mesh.
+    """
+    return extract_facial_landmarks(image_path, worker_face_mesh)
+
+
+def extract_facial_landmarks(image_path, mesh=None):
     """
     Extract 468 facial landmarks from the image using Mediapipe.
     :param image_path: Path to the image file.
+    :param mesh: Face Mesh instance to use, defaults to the module's instance.
     :return: A flattened list of x and y coordinates for each landmark point.
     """
+    if mesh is None:
+        mesh = get_face_mesh()
+
     image_name = os.path.basename(image_path)
     logging.debug(f"Processing {image_name}...")
 
@@ -37,7 +91,7 @@ def extract_facial_landmarks(image_path):
         return None
 
     img_rgb = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
-    results = face_mesh.process(img_rgb)
+    results = mesh.process(img_rgb)
 
     if results.multi_face_landmarks:
         landmarks = results.multi_face_landmarks[0]
@@ -49,53 +103,119 @@ def extract_facial_landmarks(image_path):
         return None
 
 
-def create_landmarks_csv(base_dataset_path, output_csv_dir, emotion):
+def create_landmarks_csv(
+    base_dataset_path, output_csv_dir, emotion, pool=None, output_format="csv"
+):
     """
-    Process all images in the folder, extract facial landmarks, and store them in a csv.
+    Process all images in the folder, extract facial landmarks, and store them in a csv,
+    or in a binary float32 file if output_format is "binary" (see landmark_binary.py).
     The 'emotion' parameter is the label for all data in the folder.
+    Only images that are new or changed since the last run are processed; their rows
+    are appended to the emotion's CSV and recorded in the output directory's manifest.
+    Rows of changed images, and rows a crashed run wrote but never recorded, are
+    dropped first.
+    If a process pool is given, images are spread across its workers; rows keep the
+    sorted file order either way.
     """
-    image_files = [
+    if output_format not in OUTPUT_FORMATS:
+        raise ValueError(f"output_format must be one of {OUTPUT_FORMATS}")
+
+    image_files = sorted(
         f
         for f in os.listdir(base_dataset_path)
         if f.endswith((".png", ".jpg", ".jpeg"))
-    ]
-
-    data = []
+    )
 
     # Ensure output directory exists
     ensure_directory_exists(output_csv_dir)
     logging.info(f"Output directory: {output_csv_dir}")
 
-    for file in image_files:
-        image_path = os.path.join(base_dataset_path, file)
-        logging.debug(f"Processing image: {file}")
+    # Skip the images the manifest says are already processed and unchanged
+    manifest = ExtractionManifest(output_csv_dir, output_format)
+    image_keys = [
+        ExtractionManifest.image_key(os.path.join(base_dataset_path, file))
+        for file in image_files
+    ]
+    manifest.resume_output(
+        landmark_output_path(output_format, output_csv_dir, emotion), image_keys
+    )
+    pending_keys = [key for key in image_keys if not manifest.is_processed(key)]
+
+    processed_images = []
+    processed_count = 0
 
-        landmarks = extract_facial_landmarks(image_path)
+    # Rows are streamed to the output as they are extracted
+    with open_landmark_writer(output_format, output_csv_dir, emotion) as writer:
+        # Record where the rows start, so rows of a run that crashes before its
+        # first chunk is recorded are dropped too
+        writer.flush()
+        manifest.record(writer.path, [], writer.tell())
 
-        if landmarks:
-            flattened_landmarks = [coord for point in landmarks for coord in point]
-            data.append([emotion] + flattened_landmarks)
+        for image_key, landmarks in extract_landmarks_in_order(pending_keys, pool):
+            row_offset = writer.tell()
+            if landmarks:
+                writer.write([coord for point in landmarks for coord in point])
+            processed_images.append((image_key, row_offset, writer.tell()))
 
-    # If data exists, save it to CSV
-    if data:
-        timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-        csv_filename = f"landmarks_{emotion}_{timestamp}.csv"
-        csv_path = os.path.join(output_csv_dir, csv_filename)
+            # Flush rows before recording them, so a crash never skips an image
+            if len(processed_images) >= MANIFEST_CHUNK_SIZE:
+                writer.flush()
+                manifest.record(writer.path, processed_images, writer.tell())
+                processed_count += len(processed_images)
+                processed_images = []
 
-        # Create the DataFrame
-        column_names = ["emotion"] + [
-            f"{i}_{coord}" for i in range(468) for coord in ["x", "y"]
-        ]
-        df = pd.DataFrame(data, columns=column_names)
+        writer.flush()
+        manifest.record(writer.path, processed_images, writer.tell())
+        processed_count += len(processed_images)
 
-        # Save DataFrame to CSV
-        df.to_csv(csv_path, index=False)
-        logging.info(f"CSV file created: {csv_filename}, saved to {csv_path}")
+    logging.info(
+        f"Processed {processed_count} new or changed of {len(image_files)} images "
+        f"for emotion {emotion}"
+    )
+    if writer.row_count:
+        logging.info(f"Appended {writer.row_count} rows to {writer.path}")
     else:
-        logging.warning(f"No data to save for emotion {emotion}. No CSV created.")
+        logging.warning(f"No new data to save for emotion {emotion}.")
 
 
-def generate_data_for_dataset(base_dataset_path, generated_data_base_path, emotion):
+def extract_landmarks_in_order(image_keys, pool=None):
+    """
+    Extracts the landmarks of each image, in the order given.
+    With a process pool, at most MAX_IN_FLIGHT_IMAGES images are queued or held at
+    once, so memory stays constant however many images there are.
+    :param image_keys: Iterable of manifest keys whose first item is the image path.
+    :param pool: Optional process pool created with init_worker.
+    :return: A generator of (image_key, landmarks) tuples.
+    """
+    if pool is None:
+        for image_key in image_keys:
+            yield image_key, extract_facial_landmarks(image_key[0])
+        return
+
+    in_flight = collections.deque()
+    for image_key in image_keys:
+        in_flight.append(
+            (
+                image_key,
+                pool.apply_async(extract_facial_landmarks_in_worker, (image_key[0],)),
+            )
+        )
+        if len(in_flight) >= MAX_IN_FLIGHT_IMAGES:
+            image_key, result = in_flight.popleft()
+            yield image_key, result.get()
+
+    while in_flight:
+        image_key, result = in_flight.popleft()
+        yield image_key, result.get()
+
+
+def generate_data_for_dataset(
+    base_dataset_path,
+    generated_data_base_path,
+    emotion,
+    pool=None,
+    output_format="csv",
+):
     """
     Generate landmark data for a specific dataset folder and save to a structured output folder.
     """
@@ -109,24 +229,45 @@ def generate_data_for_dataset(base_dataset_path, generated_data_base_path, emoti
     ensure_directory_exists(output_csv_dir)
 
     # Create CSV in the corresponding output directory
-    create_landmarks_csv(base_dataset_path, output_csv_dir, emotion)
+    create_landmarks_csv(base_dataset_path, output_csv_dir, emotion, pool, output_format)
 
 
-def generate_data_for_all_emotions(base_dataset_path, generated_data_base_path):
+def generate_data_for_all_emotions(
+    base_dataset_path, generated_data_base_path, num_workers=1, output_format="csv"
+):
     """
     Iterate through the 'train' folder and process each emotion folder
+    :param num_workers: Number of worker processes; 1 processes images in this process.
+    :param output_format: "csv" or "binary".
     """
     # Iterate through the 'train' folder
     train_folder = os.path.join(base_dataset_path, "train")
-    emotion_folders = [
+    emotion_folders = sorted(
         f
         for f in os.listdir(train_folder)
         if os.path.isdir(os.path.join(train_folder, f))
-    ]
+    )
 
-    for emotion in emotion_folders:
-        emotion_folder_path = os.path.join(train_folder, emotion)
-        logging.info(f"Processing emotion folder: {emotion}")
-        generate_data_for_dataset(
-            emotion_folder_path, generated_data_base_path, emotion
+    # Spawn rather than fork: the GUI thread and Mediapipe are not fork-safe
+    pool = None
+    if num_workers > 1:
+        logging.info(f"Starting {num_workers} worker processes")
+        pool = multiprocessing.get_context("spawn").Pool(
+            num_workers, initializer=init_worker
         )
+
+    try:
+        for emotion in emotion_folders:
+            emotion_folder_path = os.path.join(train_folder, emotion)
+            logging.info(f"Processing emotion folder: {emotion}")
+            generate_data_for_dataset(
+                emotion_folder_path,
+                generated_data_base_path,
+                emotion,
+                pool,
+                output_format,
+            )
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
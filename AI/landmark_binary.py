@@ -0,0 +1,125 @@
+import os
+import json
+import numpy as np
+
+# 468 face mesh landmarks with an x and a y coordinate each
+NUM_LANDMARKS = 468
+NUM_COLUMNS = NUM_LANDMARKS * 2
+DTYPE = np.float32
+ROW_BYTES = NUM_COLUMNS * np.dtype(DTYPE).itemsize
+
+BINARY_EXTENSION = ".f32"
+METADATA_EXTENSION = ".json"
+
+
+def binary_path(output_dir, emotion):
+    """
+    Returns the path of the binary landmark file of an emotion.
+    """
+    return os.path.join(output_dir, f"landmarks_{emotion}{BINARY_EXTENSION}")
+
+
+def write_metadata(data_path, emotion):
+    """
+    Writes the sidecar describing the layout of a binary landmark file.
+    """
+    metadata_path = os.path.splitext(data_path)[0] + METADATA_EXTENSION
+    if os.path.exists(metadata_path):
+        return
+
+    with open(metadata_path, "w") as metadata_file:
+        json.dump(
+            {
+                "emotion": emotion,
+                "dtype": np.dtype(DTYPE).name,
+                "columns": [
+                    f"{i}_{coord}" for i in range(NUM_LANDMARKS) for coord in ["x", "y"]
+                ],
+            },
+            metadata_file,
+            indent=4,
+        )
+
+
+def load_landmarks_binary(data_path):
+    """
+    Memory-maps a binary landmark file without reading it into memory.
+    :param data_path: Path to the binary file.
+    :return: A read-only (rows, 936) float32 array backed by the file.
+    """
+    row_count = os.path.getsize(data_path) // ROW_BYTES
+    if row_count == 0:
+        return np.empty((0, NUM_COLUMNS), dtype=DTYPE)
+    return np.memmap(
+        data_path, dtype=DTYPE, mode="r", shape=(row_count, NUM_COLUMNS)
+    )
+
+
+class LandmarkDataset:
+    """
+    Presents every binary landmark file in a directory as one labelled dataset.
+
+    Files are memory-mapped, so indexing a slice of rows only reads the pages that
+    hold those rows, no matter how large the dataset is.
+    """
+
+    def __init__(self, output_dir):
+        self.emotions = []
+        self._arrays = []
+        self._offsets = [0]  # Index of the first row of each file
+
+        for file in sorted(os.listdir(output_dir)):
+            if not file.endswith(BINARY_EXTENSION):
+                continue
+            data_path = os.path.join(output_dir, file)
+            metadata_path = os.path.splitext(data_path)[0] + METADATA_EXTENSION
+            with open(metadata_path, "r") as metadata_file:
+                emotion = json.load(metadata_file)["emotion"]
+
+            self.emotions.append(emotion)
+            self._arrays.append(load_landmarks_binary(data_path))
+            self._offsets.append(self._offsets[-1] + len(self._arrays[-1]))
+
+    def __len__(self):
+        return self._offsets[-1]
+
+    def labels(self):
+        """
+        Returns the emotion label of every row as an array of strings.
+        """
+        return np.repeat(
+            np.array(self.emotions), [len(array) for array in self._arrays]
+        )
+
+    def __getitem__(self, index):
+        """
+        Returns the landmarks and labels of the given rows.
+        :param index: A row index, slice or array of row indices.
+        :return: An (features, labels) tuple.
+        """
+        scalar = np.ndim(index) == 0 and not isinstance(index, slice)
+        if isinstance(index, slice):
+            selected_range = range(len(self))[index]
+            indices = np.arange(
+                selected_range.start, selected_range.stop, selected_range.step
+            )
+        else:
+            indices = np.atleast_1d(np.asarray(index, dtype=np.int64))
+            indices = np.where(indices < 0, indices + len(self), indices)
+            if np.any((indices < 0) | (indices >= len(self))):
+                raise IndexError(
+                    f"Row index out of range for a dataset of {len(self)} rows."
+                )
+
+        features = np.empty((len(indices), NUM_COLUMNS), dtype=DTYPE)
+        labels = np.empty(len(indices), dtype=object)
+        file_indices = np.searchsorted(self._offsets, indices, side="right") - 1
+        for file_index in np.unique(file_indices):
+            selected = file_indices == file_index
+            local = indices[selected] - self._offsets[file_index]
+            features[selected] = self._arrays[file_index][local]
+            labels[selected] = self.emotions[file_index]
+
+        if scalar:
+            return features[0], labels[0]
+        return features, labels
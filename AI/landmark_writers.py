@@ -0,0 +1,161 @@
+import os
+import csv
+import logging
+import numpy as np
+from landmark_binary import DTYPE
+from landmark_binary import NUM_LANDMARKS
+from landmark_binary import ROW_BYTES
+from landmark_binary import binary_path
+from landmark_binary import write_metadata
+
+# Column names of the landmark CSV files
+CSV_COLUMNS = ["emotion"] + [
+    f"{i}_{coord}" for i in range(NUM_LANDMARKS) for coord in ["x", "y"]
+]
+
+
+# Bytes read at a time when searching backwards for the end of the last CSV row
+TAIL_CHUNK_SIZE = 4096
+
+
+def truncate_partial_line(csv_path):
+    """
+    Drops an unterminated last line left by an interrupted write, so appended rows
+    start on a line of their own.
+    :param csv_path: Path of the CSV file.
+    """
+    with open(csv_path, "r+b") as csv_file:
+        size = csv_file.seek(0, os.SEEK_END)
+        if size == 0:
+            return
+        csv_file.seek(size - 1)
+        if csv_file.read(1) == b"\n":
+            return
+
+        # Walk back to the last newline; cut everything after it
+        end = size
+        while end > 0:
+            start = max(0, end - TAIL_CHUNK_SIZE)
+            csv_file.seek(start)
+            newline = csv_file.read(end - start).rfind(b"\n")
+            if newline != -1:
+                end = start + newline + 1
+                break
+            end = start
+        logging.warning(f"Truncating partial row at the end of {csv_path}")
+        csv_file.truncate(end)
+
+
+class LandmarkWriter:
+    """
+    Base of the streaming landmark writers: tracks the rows written and owns the
+    output file, which subclasses open.
+    """
+
+    def __init__(self, path, emotion):
+        self.path = path
+        self.emotion = emotion
+        self.row_count = 0
+        self._file = None
+
+    def tell(self):
+        """
+        Returns the byte offset just past the rows written so far.
+        """
+        return self._file.tell()
+
+    def flush(self):
+        """
+        Forces the rows written so far to disk.
+        """
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def close(self):
+        self.flush()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
+
+
+class CsvLandmarkWriter(LandmarkWriter):
+    """
+    Streams landmark rows to a CSV as they are extracted, so memory use does not
+    grow with the number of images.
+    """
+
+    def __init__(self, csv_path, emotion):
+        super().__init__(csv_path, emotion)
+
+        if os.path.exists(csv_path):
+            truncate_partial_line(csv_path)
+        write_header = not os.path.exists(csv_path) or os.path.getsize(csv_path) == 0
+        self._file = open(csv_path, "a", newline="")
+        self._writer = csv.writer(self._file)
+        if write_header:
+            self._writer.writerow(CSV_COLUMNS)
+
+    def write(self, flattened_landmarks):
+        """
+        Writes one row of flattened x, y landmark coordinates.
+        """
+        self._writer.writerow([self.emotion] + flattened_landmarks)
+        self.row_count += 1
+
+
+class BinaryLandmarkWriter(LandmarkWriter):
+    """
+    Streams landmark rows to a raw float32 file (see landmark_binary.py) as they are
+    extracted, so memory use does not grow with the number of images.
+    """
+
+    def __init__(self, data_path, emotion):
+        super().__init__(data_path, emotion)
+        write_metadata(data_path, emotion)
+
+        # Drop a partial row left by an interrupted write so rows stay aligned
+        if os.path.exists(data_path):
+            size = os.path.getsize(data_path)
+            if size % ROW_BYTES:
+                logging.warning(f"Truncating partial row at the end of {data_path}")
+                with open(data_path, "r+b") as data_file:
+                    data_file.truncate(size - size % ROW_BYTES)
+
+        self._file = open(data_path, "ab")
+
+    def write(self, flattened_landmarks):
+        """
+        Writes one row of flattened x, y landmark coordinates.
+        """
+        self._file.write(np.asarray(flattened_landmarks, dtype=DTYPE).tobytes())
+        self.row_count += 1
+
+
+def landmark_output_path(output_format, output_dir, emotion):
+    """
+    Returns the path of an emotion's output file in an output format.
+    :param output_format: "csv" or "binary".
+    :param output_dir: Directory the output file is written to.
+    :param emotion: The label of every row.
+    """
+    if output_format == "binary":
+        return binary_path(output_dir, emotion)
+    return os.path.join(output_dir, f"landmarks_{emotion}.csv")
+
+
+def open_landmark_writer(output_format, output_dir, emotion):
+    """
+    Opens the streaming writer of an output format for an emotion.
+    :param output_format: "csv" or "binary".
+    :param output_dir: Directory the output file is written to.
+    :param emotion: The label of every row.
+    """
+    path = landmark_output_path(output_format, output_dir, emotion)
+    if output_format == "binary":
+        return BinaryLandmarkWriter(path, emotion)
+    return CsvLandmarkWriter(path, emotion)
@@ -0,0 +1,85 @@
+import datetime
+import json
+import os
+import platform
+import numpy as np
+
+# Default directory for saved benchmark results
+BASELINES_DIR = os.path.join(os.path.dirname(__file__), "baselines")
+
+
+def latency_stats(latencies):
+    """
+    Summarizes a list of per-iteration latencies.
+    :param latencies: Latencies in seconds.
+    :return: A dictionary with the iteration count, FPS and p50/p95/p99 in milliseconds.
+    """
+    latencies = np.asarray(latencies, dtype=np.float64)
+    p50, p95, p99 = np.percentile(latencies, (50, 95, 99)) * 1000.0
+    total = latencies.sum()
+    return {
+        "iterations": int(latencies.size),
+        "fps": round(float(latencies.size / total), 2) if total > 0 else 0.0,
+        "p50_ms": round(float(p50), 4),
+        "p95_ms": round(float(p95), 4),
+        "p99_ms": round(float(p99), 4),
+    }
+
+
+def save_results(benchmark_name, results, output_dir=BASELINES_DIR):
+    """
+    Saves benchmark results with enough environment detail to compare runs.
+    :param benchmark_name: Name of the benchmark, used in the file name.
+    :param results: Dictionary of case name to latency_stats.
+    :param output_dir: Directory the JSON file is written to.
+    :return: Path of the written file.
+    """
+    if not os.path.exists(output_dir):
+        os.makedirs(output_dir)
+
+    timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+    output_path = os.path.join(output_dir, f"{benchmark_name}_{timestamp}.json")
+    with open(output_path, "w") as output_file:
+        json.dump(
+            {
+                "benchmark": benchmark_name,
+                "timestamp": timestamp,
+                "python": platform.python_version(),
+                "numpy": np.__version__,
+                "platform": platform.platform(),
+                "machine": platform.machine(),
+                "results": results,
+            },
+            output_file,
+            indent=4,
+        )
+    return output_path
+
+
+def compare_results(results, baseline_path, metric="p50_ms"):
+    """
+    Prints how each case compares with a saved baseline.
+    :param results: Dictionary of case name to latency_stats for the current run.
+    :param baseline_path: Path of a JSON file written by save_results.
+    :param metric: Latency metric to compare.
+    """
+    with open(baseline_path, "r") as baseline_file:
+        baseline = json.load(baseline_file)["results"]
+
+    print(f"Comparison of {metric} against {baseline_path}:")
+    for name, stats in results.items():
+        if name not in baseline:
+            print(f"  {name}: no baseline")
+            continue
+        before = baseline[name][metric]
+        after = stats[metric]
+        change = (after - before) / before * 100.0 if before else 0.0
+        print(f"  {name}: {before:.4f} -> {after:.4f} ms ({change:+.1f}%)")
+
+
+def print_results(results):
+    for name, stats in results.items():
+        print(
+            f"{name}: {stats['fps']:.1f}/s, p50 {stats['p50_ms']:.4f} ms, "
+            f"p95 {stats['p95_ms']:.4f} ms, p99 {stats['p99_ms']:.4f} ms"
+        )
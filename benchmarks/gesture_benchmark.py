@@ -0,0 +1,126 @@
+"""
+Microbenchmarks for the gesture predicates and facial expression checks on
+fabricated landmark objects. No camera or Mediapipe inference is needed.
+
+Run from the repository root:
+> python -m benchmarks.gesture_benchmark [--compare benchmarks/baselines/<file>.json]
+"""
+
+import argparse
+import time
+import numpy as np
+from benchmarks.baseline import compare_results
+from benchmarks.baseline import latency_stats
+from benchmarks.baseline import print_results
+from benchmarks.baseline import save_results
+from gestures.engine import create_default_gesture_engine
+from gestures.peace_sign import is_peace_sign
+from gestures.thumbs_down import is_thumb_down
+from gestures.thumbs_out import is_thumb_out
+from gestures.thumbs_up import is_thumb_up
+from gestures.utils import HandFeatures
+from gestures.utils import get_relative_positions
+from facial_expressions.smiling import is_smiling
+
+NUM_HAND_LANDMARKS = 21
+NUM_FACE_LANDMARKS = 468
+
+
+class FakeLandmark:
+    """Stand-in for a Mediapipe NormalizedLandmark."""
+
+    __slots__ = ("x", "y", "z")
+
+    def __init__(self, x, y, z):
+        self.x = x
+        self.y = y
+        self.z = z
+
+
+class FakeLandmarkList:
+    """Stand-in for a Mediapipe NormalizedLandmarkList."""
+
+    def __init__(self, points):
+        self.landmark = [FakeLandmark(float(x), float(y), float(z)) for x, y, z in points]
+
+
+def fabricate_landmarks(rng, count, num_landmarks):
+    """
+    Creates landmark lists with coordinates scattered around the frame center.
+    :param rng: NumPy random generator, seeded for reproducible runs.
+    :param count: Number of landmark lists to create.
+    :param num_landmarks: Number of landmarks in each list.
+    """
+    points = rng.normal(0.5, 0.1, size=(count, num_landmarks, 3))
+    return [FakeLandmarkList(p) for p in points]
+
+
+def time_calls(function, inputs, iterations):
+    """
+    Times individual calls of function, cycling through inputs.
+    :return: The latency_stats of the calls.
+    """
+    latencies = np.empty(iterations, dtype=np.float64)
+    for i in range(iterations):
+        argument = inputs[i % len(inputs)]
+        start = time.perf_counter()
+        function(argument)
+        latencies[i] = time.perf_counter() - start
+    return latency_stats(latencies)
+
+
+def run_benchmarks(iterations, seed):
+    rng = np.random.default_rng(seed)
+    hands = fabricate_landmarks(rng, 64, NUM_HAND_LANDMARKS)
+    faces = fabricate_landmarks(rng, 64, NUM_FACE_LANDMARKS)
+    hand_features = [HandFeatures.from_hand_landmarks(hand) for hand in hands]
+
+    # Two hands per frame, as with the default max_num_hands
+    engine = create_default_gesture_engine()
+    hand_pairs = [
+        HandFeatures.from_multi_hand_landmarks(hands[i : i + 2])
+        for i in range(0, len(hands), 2)
+    ]
+
+    cases = {
+        "get_relative_positions": (get_relative_positions, hands),
+        "HandFeatures.from_hand_landmarks": (HandFeatures.from_hand_landmarks, hands),
+        "is_thumb_up": (is_thumb_up, hands),
+        "is_thumb_down": (is_thumb_down, hands),
+        "is_thumb_out": (is_thumb_out, hands),
+        "is_peace_sign": (is_peace_sign, hands),
+        "is_thumb_up[features]": (is_thumb_up, hand_features),
+        "is_thumb_down[features]": (is_thumb_down, hand_features),
+        "is_thumb_out[features]": (is_thumb_out, hand_features),
+        "is_peace_sign[features]": (is_peace_sign, hand_features),
+        "GestureEngine.evaluate[2 hands]": (engine.evaluate, hand_pairs),
+        "is_smiling": (is_smiling, faces),
+    }
+    return {
+        name: time_calls(function, inputs, iterations)
+        for name, (function, inputs) in cases.items()
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Microbenchmark gesture predicates and expression checks."
+    )
+    parser.add_argument("--iterations", type=int, default=20000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--compare", help="Baseline JSON file to compare against")
+    parser.add_argument(
+        "--no-save", action="store_true", help="Do not save the results as a baseline"
+    )
+    args = parser.parse_args()
+
+    results = run_benchmarks(args.iterations, args.seed)
+    print_results(results)
+    if args.compare:
+        compare_results(results, args.compare)
+    if not args.no_save:
+        print(f"Results saved to {save_results('gestures', results)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""
+Replays a recorded frame corpus, or synthetic frames, through TrackersPipeline for
+every combination of enabled tracker pipelines and reports FPS and latency.
+
+Run from the repository root:
+> python -m benchmarks.pipeline_benchmark --source session.mp4
+> python -m benchmarks.pipeline_benchmark --synthetic-frames 200
+"""
+
+import argparse
+import copy
+import itertools
+import json
+import time
+import numpy as np
+from benchmarks.baseline import compare_results
+from benchmarks.baseline import latency_stats
+from benchmarks.baseline import print_results
+from benchmarks.baseline import save_results
+from offline_processor import iter_frames
+from trackers_pipeline import TrackersPipeline
+from tracker_pipelines.overlay import Overlay
+
+PIPELINE_NAMES = ("hand", "body", "face")
+
+# Leading frames left out of the results, so model loading is not measured
+WARMUP_FRAMES = 5
+
+
+def load_corpus(source, max_frames):
+    """
+    Decodes up to max_frames frames of a video file or image directory into memory,
+    so decoding is not part of the measurement.
+    """
+    return list(itertools.islice(iter_frames(source), max_frames))
+
+
+def synthetic_corpus(count, width, height, seed):
+    """
+    Creates random frames. Mediapipe finds no landmarks in them, so they measure
+    detection cost only; use a recorded corpus for representative numbers.
+    """
+    rng = np.random.default_rng(seed)
+    return [
+        rng.integers(0, 256, size=(height, width, 3), dtype=np.uint8)
+        for _ in range(count)
+    ]
+
+
+def pipeline_combinations():
+    """Yields every non-empty combination of enabled pipelines."""
+    for size in range(1, len(PIPELINE_NAMES) + 1):
+        yield from itertools.combinations(PIPELINE_NAMES, size)
+
+
+def benchmark_combination(config, enabled, frames):
+    """
+    Times TrackersPipeline.process_frame and overlay rendering for every frame.
+    The corpus is played once, in order, and the first WARMUP_FRAMES frames are
+    left out of the results; at least one frame is always reported.
+    :param config: The loaded config.json.
+    :param enabled: Names of the pipelines to enable.
+    :param frames: The frame corpus.
+    :return: The latency_stats of the frames after the warm-up.
+    """
+    config = copy.deepcopy(config)
+    config["tracker_pipelines"] = {name: name in enabled for name in PIPELINE_NAMES}
+    trackers_pipeline = TrackersPipeline(config)
+
+    try:
+        latencies = np.empty(len(frames), dtype=np.float64)
+        for i, frame in enumerate(frames):
+            render_frame = frame.copy()
+            start = time.perf_counter()
+            overlay = Overlay()
+            trackers_pipeline.process_frame(render_frame, overlay)
+            overlay.render(render_frame)
+            latencies[i] = time.perf_counter() - start
+    finally:
+        trackers_pipeline.stop()
+    return latency_stats(latencies[min(WARMUP_FRAMES, len(frames) - 1) :])
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark TrackersPipeline for every pipeline combination."
+    )
+    parser.add_argument("--source", help="Video file or directory of frames to replay")
+    parser.add_argument("--max-frames", type=int, default=300)
+    parser.add_argument(
+        "--synthetic-frames",
+        type=int,
+        default=100,
+        help="Number of random frames used when no --source is given",
+    )
+    parser.add_argument("--width", type=int, default=640)
+    parser.add_argument("--height", type=int, default=480)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("-c", "--config", default="config.json")
+    parser.add_argument("--compare", help="Baseline JSON file to compare against")
+    parser.add_argument(
+        "--no-save", action="store_true", help="Do not save the results as a baseline"
+    )
+    args = parser.parse_args()
+
+    with open(args.config, "r") as config_file:
+        config = json.load(config_file)
+
+    if args.source:
+        frames = load_corpus(args.source, args.max_frames)
+    else:
+        frames = synthetic_corpus(
+            args.synthetic_frames, args.width, args.height, args.seed
+        )
+    if not frames:
+        raise SystemExit("No frames to benchmark.")
+
+    results = {
+        "+".join(enabled): benchmark_combination(config, enabled, frames)
+        for enabled in pipeline_combinations()
+    }
+    print_results(results)
+    if args.compare:
+        compare_results(results, args.compare)
+    if not args.no_save:
+        print(f"Results saved to {save_results('pipelines', results)}")
+
+
+if __name__ == "__main__":
+    main()
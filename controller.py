@@ -1,27 +1,72 @@
+import time
+
+# Taken before the imports below so the startup report includes loading them
+PROCESS_START_TIME = time.perf_counter()
+
 import threading
 import cv2
-import copy
 import json
+from frame_capture import FrameCapture
+from landmark_log import LandmarkRecorder
+from latency_monitor import latency_monitor
 from trackers_pipeline import TrackersPipeline
+from tracker_pipelines.overlay import Overlay
 from reconfigure_modal import ReconfigureModal
 
+# Number of preallocated frames in the capture ring buffer
+CAPTURE_BUFFER_SIZE = 3
+
 
 class Controller:
-    def __init__(self):
+    def __init__(self, on_results=None, on_gesture_events=None):
+        # Duration of each startup phase, reported once the first frame is processed
+        self.startup_timings = {}
+        self._last_startup_mark = PROCESS_START_TIME
+        self.mark_startup_phase("imports")
+
         self.cap = cv2.VideoCapture(0)  # Initialize the camera feed
+        self.frame_capture = FrameCapture(self.cap, CAPTURE_BUFFER_SIZE)
+        self.mark_startup_phase("camera_open")
 
         # Load the tracker states from the config file
         self.config = self.load_config()
 
-        # Initialize the TrackersPipeline
+        # Initialize the TrackersPipeline; pipelines and models are created lazily
         self.trackers_pipeline = TrackersPipeline(self.config)
+        self.mark_startup_phase("config_and_pipelines")
+
+        # Headless mode skips rendering and display and only emits results
+        self.headless = self.config.get("controller", {}).get("headless", False)
+
+        # Per-stage latency instrumentation, disabled unless configured
+        latency_config = self.config.get("latency_monitor", {})
+        latency_monitor.configure(
+            enabled=latency_config.get("enabled", False),
+            window_size=latency_config.get("window_size", 300),
+            dump_path=latency_config.get("dump_path"),
+            dump_interval=latency_config.get("dump_interval", 10.0),
+        )
+        self.show_latency_overlay = latency_config.get("overlay", False)
+
+        # Optional log of every frame's landmarks, for replay without a camera
+        record_path = self.config.get("landmark_recorder", {}).get("path")
+        self.landmark_recorder = LandmarkRecorder(record_path) if record_path else None
+
+        # Optional callback receiving the pipeline results of every frame
+        self.on_results = on_results
+
+        # Optional callback receiving gesture start and end events as they happen
+        self.on_gesture_events = on_gesture_events
 
         # Signal to stop the tracking loop
         self.stop_signal = False
 
         # Start the reconfiguration modal in a separate thread
-        self.reconfigure_thread = threading.Thread(target=self.start_reconfigure_modal)
-        self.reconfigure_thread.start()
+        if not self.headless:
+            self.reconfigure_thread = threading.Thread(
+                target=self.start_reconfigure_modal
+            )
+            self.reconfigure_thread.start()
 
     def load_config(self):
         """Loads tracker states from the config.json file."""
@@ -33,25 +78,78 @@ class Controller:
             print("Configuration file not found. Exiting.")
             self.stop_tracking()
 
+    def mark_startup_phase(self, phase):
+        """Records the time spent since the previous startup phase ended."""
+        now = time.perf_counter()
+        self.startup_timings[phase] = now - self._last_startup_mark
+        self._last_startup_mark = now
+
+    def print_startup_report(self):
+        """Prints how long each startup phase took, up to the first processed frame."""
+        phases = ", ".join(
+            f"{phase} {seconds * 1000.0:.0f} ms"
+            for phase, seconds in self.startup_timings.items()
+        )
+        total = self._last_startup_mark - PROCESS_START_TIME
+        print(f"Startup: {phases}; first frame after {total * 1000.0:.0f} ms.")
+
     def start_tracking(self):
         """Main loop for capturing frames and processing pipelines."""
+        # Capture runs on its own thread; always process the newest frame
+        self.frame_capture.start()
+
+        # Load the enabled models while the camera delivers its first frame
+        self.trackers_pipeline.warm_up()
+        self.mark_startup_phase("model_load")
+
+        first_frame = True
         while not self.stop_signal:
-            ret, raw_frame = self.cap.read()
+            # Time spent waiting for the capture thread's next frame; the camera
+            # read itself is timed as "capture" on that thread
+            with latency_monitor.stage("wait_frame"):
+                ret, raw_frame = self.frame_capture.read()
             if not ret:
                 print("Failed to grab frame from camera.")
                 break
+            if first_frame:
+                self.mark_startup_phase("first_capture")
 
-            # Create a copy for rendering the processed frame
-            render_frame = copy.deepcopy(raw_frame)
+            # Record the pipelines' drawing only when the frame will be displayed
+            overlay = None if self.headless else Overlay()
 
             # Process the frame through all enabled pipelines
-            self.trackers_pipeline.process_frame(raw_frame, render_frame)
+            with latency_monitor.stage("pipelines"):
+                results = self.trackers_pipeline.process_frame(raw_frame, overlay)
+            if self.on_results is not None:
+                self.on_results(results)
+            if self.landmark_recorder is not None:
+                with latency_monitor.stage("record_landmarks"):
+                    self.landmark_recorder.record(self.trackers_pipeline)
+            gesture_events = self.trackers_pipeline.take_gesture_events()
+            if gesture_events and self.on_gesture_events is not None:
+                self.on_gesture_events(gesture_events)
+            if first_frame:
+                self.mark_startup_phase("first_process")
+                self.print_startup_report()
+                first_frame = False
+
+            latency_monitor.maybe_dump()
+            if self.headless:
+                continue
+
+            # Draw the overlay onto the captured frame once all pipelines are done
+            if self.show_latency_overlay and latency_monitor.enabled:
+                overlay.add(latency_monitor.draw_overlay)
+            with latency_monitor.stage("draw"):
+                overlay.render(raw_frame)
 
             # Display the processed frame
-            cv2.imshow("Combined Pipeline Tracking", render_frame)
+            with latency_monitor.stage("display"):
+                cv2.imshow("Combined Pipeline Tracking", raw_frame)
+                key = cv2.waitKey(5) & 0xFF
 
             # Exit on pressing 'q'
-            if cv2.waitKey(5) & 0xFF == ord("q"):
+            if key == ord("q"):
                 self.stop_signal = True
                 break
 
@@ -70,9 +168,25 @@ class Controller:
         if hasattr(self, "reconfigure_thread") and self.reconfigure_thread.is_alive():
             self.modal.root.quit()  # Ensure the Tkinter window is closed
 
+        # Stop the capture thread before releasing the camera
+        self.frame_capture.stop()
+        print(
+            f"Captured {self.frame_capture.captured_frames} frames, "
+            f"dropped {self.frame_capture.dropped_frames}."
+        )
+        if self.trackers_pipeline.motion_gate.enabled:
+            print(self.trackers_pipeline.motion_gate.summary())
+        if getattr(self, "landmark_recorder", None) is not None:
+            self.landmark_recorder.close()
+            print(
+                f"Recorded the landmarks of {self.landmark_recorder.frame_count} "
+                f"frames to {self.landmark_recorder.writer.path}."
+            )
+
         # Release camera resources and close OpenCV windows
         self.cap.release()
-        cv2.destroyAllWindows()
+        if not self.headless:
+            cv2.destroyAllWindows()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,110 @@
+import threading
+import numpy as np
+from latency_monitor import latency_monitor
+
+
+class FrameCapture:
+    """
+    Reads frames from a cv2.VideoCapture on a dedicated thread into a small ring
+    buffer of preallocated frames, so capture never waits on frame processing.
+
+    The consumer always receives the newest frame. Frames overwritten before the
+    consumer got to them are counted in dropped_frames.
+    """
+
+    def __init__(self, cap, buffer_size=3):
+        # One slot being written, one holding the newest frame, one being read
+        if buffer_size < 3:
+            raise ValueError("buffer_size must be at least 3.")
+        self._cap = cap
+        # Allocated once the first frame reveals the camera's frame shape
+        self._buffer = [None] * buffer_size
+
+        self._condition = threading.Condition()
+        self._latest_slot = None  # Slot holding the newest frame
+        self._reading_slot = None  # Slot handed out to the consumer
+        self._latest_sequence = 0  # Number of frames captured so far
+        self._read_sequence = 0  # Sequence number of the last frame consumed
+        self._failed = False
+
+        self.captured_frames = 0
+        self.dropped_frames = 0
+
+        self._stop_signal = False
+        self._thread = threading.Thread(target=self._capture_loop, daemon=True)
+
+    def start(self):
+        """Starts the capture thread."""
+        self._thread.start()
+        return self
+
+    @property
+    def failed(self):
+        """True once the source stopped delivering frames, e.g. at the end of a file."""
+        return self._failed
+
+    def _next_write_slot(self):
+        # Pick a slot that is neither the newest frame nor the one being read
+        for offset in range(1, len(self._buffer) + 1):
+            slot = ((self._latest_slot or 0) + offset) % len(self._buffer)
+            if slot != self._latest_slot and slot != self._reading_slot:
+                return slot
+
+    def _capture_loop(self):
+        """Continuously grabs frames from the camera into the ring buffer."""
+        while not self._stop_signal:
+            with self._condition:
+                slot = self._next_write_slot()
+
+            # Read into the preallocated frame outside the lock
+            with latency_monitor.stage("capture"):
+                ret, frame = self._cap.read(self._buffer[slot])
+            if not ret:
+                with self._condition:
+                    self._failed = True
+                    self._condition.notify_all()
+                break
+
+            with self._condition:
+                if self._buffer[slot] is None:
+                    # Allocate every other slot up front, so no later read allocates
+                    self._buffer = [
+                        np.empty_like(frame) if buffered is None else buffered
+                        for buffered in self._buffer
+                    ]
+                self._buffer[slot] = frame
+                self._latest_slot = slot
+                self._latest_sequence += 1
+                self.captured_frames += 1
+                self._condition.notify_all()
+
+    def read(self, timeout=None):
+        """
+        Returns the newest frame not yet seen by the consumer, waiting for one if needed.
+        The returned frame stays valid until the next call to read.
+        :param timeout: Maximum number of seconds to wait for a frame.
+        :return: A (ret, frame) tuple like cv2.VideoCapture.read.
+        """
+        with self._condition:
+            has_new_frame = self._condition.wait_for(
+                lambda: self._latest_sequence > self._read_sequence
+                or self._failed
+                or self._stop_signal,
+                timeout,
+            )
+            if not has_new_frame or self._latest_sequence == self._read_sequence:
+                return False, None
+
+            # Count the frames that were overwritten before they could be read
+            self.dropped_frames += self._latest_sequence - self._read_sequence - 1
+            self._read_sequence = self._latest_sequence
+            self._reading_slot = self._latest_slot
+            return True, self._buffer[self._reading_slot]
+
+    def stop(self):
+        """Stops the capture thread and waits for it to exit."""
+        with self._condition:
+            self._stop_signal = True
+            self._condition.notify_all()
+        if self._thread.is_alive():
+            self._thread.join()
@@ -0,0 +1,104 @@
+import numpy as np
+from gestures.utils import HandFeatures
+from gestures.thumbs_up import is_thumb_up_batch
+from gestures.thumbs_down import is_thumb_down_batch
+from gestures.thumbs_out import is_thumb_out_batch
+from gestures.peace_sign import is_peace_sign_batch
+
+
+class GestureEngine:
+    """
+    Evaluates every registered gesture over all hands detected in a frame at once.
+
+    Each gesture is a vectorized predicate that takes a stacked HandFeatures and
+    returns an (N,) boolean array, so a frame costs one NumPy call per gesture no
+    matter how many hands are in view. A GestureClassifier adds all of its gestures
+    at once and classifies them in a single call.
+    """
+
+    def __init__(self):
+        self._names = []
+        self._predicates = []  # (column, predicate) pairs
+        self._classifiers = []  # (first column, classifier) pairs
+
+    @property
+    def names(self):
+        return list(self._names)
+
+    def register(self, name, predicate):
+        """
+        Registers a vectorized gesture predicate.
+        :param name: Unique name of the gesture, used as its column in the results.
+        :param predicate: Callable taking a stacked HandFeatures and returning an
+                          (N,) boolean array.
+        """
+        if name in self._names:
+            raise ValueError(f"Gesture '{name}' is already registered.")
+        self._predicates.append((len(self._names), predicate))
+        self._names.append(name)
+
+    def register_classifier(self, classifier):
+        """
+        Registers every gesture of a trained classifier.
+        :param classifier: A GestureClassifier, or any object with a names list and a
+                           classify method returning an (N, len(names)) boolean
+                           matrix for a stacked HandFeatures and the handedness
+                           label of each hand.
+        """
+        duplicates = set(classifier.names) & set(self._names)
+        if duplicates:
+            raise ValueError(f"Gestures {sorted(duplicates)} are already registered.")
+        self._classifiers.append((len(self._names), classifier))
+        self._names.extend(classifier.names)
+
+    def index(self, name):
+        """
+        Returns the column of a gesture in the results matrix.
+        :param name: Name of a registered gesture.
+        :return: The column index.
+        """
+        return self._names.index(name)
+
+    def evaluate(self, hand_features, handedness=None):
+        """
+        Evaluates every registered gesture for every hand.
+        :param hand_features: HandFeatures or an array holding (N, 21, 3) landmarks.
+        :param handedness: "Left" or "Right" label of each hand, or None if unknown.
+                           Only classifiers use it.
+        :return: An (N, G) boolean matrix with one column per registered gesture.
+        """
+        if not isinstance(hand_features, HandFeatures):
+            hand_features = HandFeatures(hand_features)
+
+        results = np.zeros((len(hand_features), len(self._names)), dtype=bool)
+        if len(hand_features) == 0:
+            return results
+
+        for column, predicate in self._predicates:
+            results[:, column] = predicate(hand_features)
+        for first_column, classifier in self._classifiers:
+            results[:, first_column : first_column + len(classifier.names)] = (
+                classifier.classify(hand_features, handedness)
+            )
+        return results
+
+    def bitmask(self, results):
+        """
+        Packs a results matrix into one integer per hand, bit i set for gesture i.
+        :param results: An (N, G) boolean matrix returned by evaluate.
+        :return: An (N,) array of gesture bitmasks.
+        """
+        weights = np.left_shift(1, np.arange(results.shape[1], dtype=np.int64))
+        return results.astype(np.int64) @ weights
+
+
+def create_default_gesture_engine():
+    """
+    Creates a GestureEngine with all of the built-in gestures registered.
+    """
+    engine = GestureEngine()
+    engine.register("thumbs_up", is_thumb_up_batch)
+    engine.register("thumbs_down", is_thumb_down_batch)
+    engine.register("thumbs_out", is_thumb_out_batch)
+    engine.register("peace_sign", is_peace_sign_batch)
+    return engine
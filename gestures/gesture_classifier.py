@@ -0,0 +1,275 @@
+import argparse
+import os
+import sys
+import numpy as np
+from gestures.utils import HandFeatures
+from gestures.utils import mp_hand_landmarks
+from landmark_log import LandmarkLogReader
+
+# Label of recorded samples showing no gesture; they are used to reject
+# look-alike hands but never reported as a gesture
+NO_GESTURE = "none"
+
+# Number of neighbors voting on each hand
+NEIGHBORS = 5
+
+# Training samples kept per label, so the lookup cost stays fixed no matter how
+# much footage the classifier was trained on
+MAX_SAMPLES_PER_LABEL = 2000
+
+# A hand is only classified if its neighbors are at most this many times farther
+# away than training samples typically are from their nearest neighbor
+REJECT_MARGIN = 2.0
+
+# Percentile of the training nearest-neighbor distances the margin is applied to
+REJECT_PERCENTILE = 95
+
+# Training samples compared at once when measuring nearest-neighbor distances
+DISTANCE_CHUNK_SIZE = 256
+
+
+def gesture_vectors(hand_features, handedness=None):
+    """
+    Turns hands into feature vectors that do not depend on where the hand is in the
+    frame, how it is rotated or how far it is from the camera, or on which hand it is.
+    :param hand_features: HandFeatures, or an (N, 21, 3) array of landmarks.
+    :param handedness: "Left" or "Right" label of each hand, or None if unknown.
+    :return: An (N, 42) float32 array of wrist-frame x, y coordinates, scaled so the
+             wrist to middle finger MCP distance is 1, with left hands mirrored.
+    """
+    if not isinstance(hand_features, HandFeatures):
+        hand_features = HandFeatures(hand_features)
+    relative = hand_features.relative.reshape(-1, 21, 2)
+
+    # In the wrist frame the middle finger MCP lies on the y-axis at the palm length
+    palm_length = relative[:, mp_hand_landmarks.MIDDLE_FINGER_MCP, 1]
+    vectors = relative / np.maximum(palm_length, 1e-6)[:, np.newaxis, np.newaxis]
+
+    # A left hand is the mirror image of a right hand across the wrist frame y-axis
+    if handedness:
+        left = np.array([label == "Left" for label in handedness], dtype=bool)
+        vectors[left, :, 0] *= -1
+    return vectors.reshape(len(vectors), 21 * 2).astype(np.float32)
+
+
+def squared_distances(vectors, samples, sample_norms):
+    """
+    Squared Euclidean distances between every vector and every sample, as one
+    matrix multiply.
+    :return: An (N, M) array.
+    """
+    distances = (
+        np.einsum("ij,ij->i", vectors, vectors)[:, np.newaxis]
+        - 2.0 * vectors @ samples.T
+        + sample_norms
+    )
+    return np.maximum(distances, 0.0)
+
+
+class GestureClassifier:
+    """
+    k-nearest-neighbor gesture classifier over wrist-normalized landmark vectors.
+
+    The training samples are kept as one matrix, so classifying every hand in a
+    frame against every gesture is a single matrix multiply whose cost depends on
+    the number of samples, not on the number of gestures. Left hands are mirrored
+    onto right hands, so samples of either hand recognize the gesture on both when
+    the handedness is known.
+    """
+
+    def __init__(self, neighbors=NEIGHBORS):
+        self.neighbors = neighbors
+        self.names = []  # Gestures the classifier reports, in column order
+        self.samples = np.empty((0, 42), dtype=np.float32)
+        self.sample_labels = np.empty(0, dtype=np.int64)  # -1 for NO_GESTURE
+        self.sample_norms = np.empty(0, dtype=np.float32)
+        self.max_distance = np.inf
+
+    def fit(self, vectors, labels, max_samples_per_label=MAX_SAMPLES_PER_LABEL):
+        """
+        Builds the classifier from labelled samples.
+        :param vectors: An (M, 42) array from gesture_vectors.
+        :param labels: The gesture name of each sample, or NO_GESTURE.
+        :param max_samples_per_label: Samples kept per label, chosen at random.
+        :return: self
+        """
+        vectors = np.asarray(vectors, dtype=np.float32)
+        labels = np.asarray(labels)
+        rng = np.random.default_rng(0)
+        self.names = sorted(set(labels.tolist()) - {NO_GESTURE})
+
+        # Frames the pipelines held rather than re-detected repeat the same hand
+        _, unique = np.unique(vectors, axis=0, return_index=True)
+
+        keep = []
+        for label in sorted(set(labels.tolist())):
+            indices = unique[labels[unique] == label]
+            if len(indices) > max_samples_per_label:
+                indices = rng.choice(indices, max_samples_per_label, replace=False)
+            keep.append(indices)
+        keep = np.sort(np.concatenate(keep))
+
+        self.samples = vectors[keep]
+        self.sample_labels = np.array(
+            [
+                self.names.index(label) if label != NO_GESTURE else -1
+                for label in labels[keep].tolist()
+            ],
+            dtype=np.int64,
+        )
+        self.sample_norms = np.einsum("ij,ij->i", self.samples, self.samples)
+        self.max_distance = self.rejection_distance()
+        return self
+
+    def rejection_distance(self):
+        """
+        Measures how far training samples are from their nearest other sample.
+        :return: The distance beyond which a hand is not classified.
+        """
+        if len(self.samples) < 2:
+            return np.inf
+
+        nearest = np.empty(len(self.samples), dtype=np.float32)
+        for start in range(0, len(self.samples), DISTANCE_CHUNK_SIZE):
+            chunk = self.samples[start : start + DISTANCE_CHUNK_SIZE]
+            distances = squared_distances(chunk, self.samples, self.sample_norms)
+            # Exclude each sample's distance to itself
+            distances[np.arange(len(chunk)), np.arange(start, start + len(chunk))] = (
+                np.inf
+            )
+            nearest[start : start + len(chunk)] = distances.min(axis=1)
+        return float(np.sqrt(np.percentile(nearest, REJECT_PERCENTILE))) * REJECT_MARGIN
+
+    def classify(self, hand_features, handedness=None):
+        """
+        Classifies every hand.
+        :param hand_features: HandFeatures, or an (N, 21, 3) array of landmarks.
+        :param handedness: "Left" or "Right" label of each hand, or None if unknown.
+        :return: An (N, G) boolean matrix with one column per gesture in names, with
+                 at most one gesture set per hand.
+        """
+        vectors = gesture_vectors(hand_features, handedness)
+        results = np.zeros((len(vectors), len(self.names)), dtype=bool)
+        if len(vectors) == 0 or len(self.samples) == 0:
+            return results
+
+        k = min(self.neighbors, len(self.samples))
+        distances = squared_distances(vectors, self.samples, self.sample_norms)
+        nearest = np.argpartition(distances, k - 1, axis=1)[:, :k]
+
+        # Majority vote of the neighbors; NO_GESTURE samples, labelled -1, vote in
+        # the last column
+        votes = np.zeros((len(vectors), len(self.names) + 1), dtype=np.int64)
+        neighbor_labels = self.sample_labels[nearest]
+        for column in range(k):
+            votes[np.arange(len(vectors)), neighbor_labels[:, column]] += 1
+        winners = votes.argmax(axis=1)
+
+        # Hands unlike anything seen in training show no gesture
+        mean_distance = np.sqrt(np.take_along_axis(distances, nearest, axis=1)).mean(
+            axis=1
+        )
+        recognized = (winners < len(self.names)) & (mean_distance <= self.max_distance)
+        results[np.flatnonzero(recognized), winners[recognized]] = True
+        return results
+
+    def save(self, path):
+        """
+        Saves the classifier to a .npz file.
+        :param path: Path of the file to write.
+        """
+        np.savez_compressed(
+            path,
+            names=np.array(self.names, dtype=str),
+            samples=self.samples,
+            sample_labels=self.sample_labels,
+            neighbors=self.neighbors,
+            max_distance=self.max_distance,
+        )
+
+    @classmethod
+    def load(cls, path):
+        """
+        Loads a classifier saved with save.
+        :param path: Path of the .npz file.
+        :return: A GestureClassifier instance.
+        """
+        with np.load(path) as data:
+            classifier = cls(int(data["neighbors"]))
+            classifier.names = data["names"].tolist()
+            classifier.samples = data["samples"]
+            classifier.sample_labels = data["sample_labels"]
+            classifier.max_distance = float(data["max_distance"])
+        classifier.sample_norms = np.einsum(
+            "ij,ij->i", classifier.samples, classifier.samples
+        )
+        return classifier
+
+
+def load_recorded_samples(labelled_logs):
+    """
+    Collects the hands of landmark logs as training samples.
+    :param labelled_logs: Pairs of a label and the path of a landmark log recorded
+                          while showing that gesture, or NO_GESTURE.
+    :return: An (M, 42) array of gesture vectors and the label of each, with M 0
+             if no log holds a hand.
+    """
+    vectors, labels = [np.empty((0, 21 * 2), dtype=np.float32)], []
+    for label, log_path in labelled_logs:
+        hands, handedness = [], []
+        for record in LandmarkLogReader(log_path):
+            if len(record.hands):
+                hands.append(record.hands)
+                handedness.extend(record.handedness or [None] * len(record.hands))
+        if not hands:
+            print(f"No hands recorded in {log_path}, skipping.")
+            continue
+        log_vectors = gesture_vectors(np.concatenate(hands), handedness)
+        vectors.append(log_vectors)
+        labels.extend([label] * len(log_vectors))
+        print(f"{label}: {len(log_vectors)} samples from {log_path}")
+    return np.concatenate(vectors), labels
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Train a gesture classifier from recorded landmark logs."
+    )
+    parser.add_argument(
+        "samples",
+        nargs="+",
+        help=f"label=path pairs of landmark logs; use the label '{NO_GESTURE}' for "
+        f"footage without a gesture",
+    )
+    parser.add_argument(
+        "-o", "--output", required=True, help="Path of the .npz file to write"
+    )
+    parser.add_argument(
+        "-k", "--neighbors", type=int, default=NEIGHBORS, help="Neighbors per vote"
+    )
+    args = parser.parse_args()
+
+    labelled_logs = []
+    for sample in args.samples:
+        label, _, log_path = sample.partition("=")
+        if not label or not log_path:
+            parser.error(f"expected a label=path pair, got '{sample}'")
+        if not os.path.isfile(log_path):
+            parser.error(f"landmark log not found: {log_path}")
+        labelled_logs.append((label, log_path))
+
+    vectors, labels = load_recorded_samples(labelled_logs)
+    if not len(vectors):
+        print("No hands were recorded in any of the logs; nothing to train on.")
+        sys.exit(1)
+    classifier = GestureClassifier(args.neighbors).fit(vectors, labels)
+    classifier.save(args.output)
+    print(
+        f"Trained on {len(classifier.samples)} samples of {classifier.names}; "
+        f"rejecting hands over {classifier.max_distance:.3f} away. "
+        f"Saved to {args.output}"
+    )
+
+
+if __name__ == "__main__":
+    main()
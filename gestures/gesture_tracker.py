@@ -0,0 +1,125 @@
+import numpy as np
+
+# Consecutive frames a gesture must be detected, or missed, before it starts or ends
+HOLD_FRAMES = 3
+
+
+def hand_keys(hand_count, handedness=None):
+    """
+    Identifies each hand of a frame for the gesture tracker by its handedness, so a
+    hand keeps its gesture state while the result order changes.
+    :param hand_count: Number of hands detected in the frame.
+    :param handedness: "Left" or "Right" label of each hand, or None if unknown.
+    :return: A unique key per hand, in result order.
+    """
+    keys = []
+    for i in range(hand_count):
+        key = handedness[i] if handedness else str(i)
+        if key in keys:
+            # Two hands reported with the same handedness
+            key = f"{key}_{i}"
+        keys.append(key)
+    return keys
+
+
+class GestureTracker:
+    """
+    Turns the per-frame results of a GestureEngine into stable gesture states per
+    hand, and emits start and end events when a state changes.
+
+    A gesture starts once it was detected on hold_frames consecutive frames and
+    ends once it was missed on hold_frames consecutive frames, so a gesture that
+    flickers for a frame neither fires nor gets interrupted. Hands are identified
+    by a key such as their handedness label; a hand that leaves the view counts as
+    showing no gesture.
+    """
+
+    def __init__(self, gesture_engine, hold_frames=HOLD_FRAMES):
+        if hold_frames < 1:
+            raise ValueError("hold_frames must be at least 1.")
+        self.gesture_engine = gesture_engine
+        self.hold_frames = hold_frames
+        self._active = {}  # Hand key -> (G,) bool array of started gestures
+        self._streaks = {}  # Hand key -> (G,) frames detection disagreed with state
+
+    def _state(self, hand_key, gesture_count):
+        active = self._active.get(hand_key)
+        streak = self._streaks.get(hand_key)
+        if active is None:
+            active = np.zeros(gesture_count, dtype=bool)
+            streak = np.zeros(gesture_count, dtype=np.int32)
+        elif len(active) < gesture_count:
+            # Gestures registered after the hand was first seen start inactive
+            padding = gesture_count - len(active)
+            active = np.concatenate([active, np.zeros(padding, dtype=bool)])
+            streak = np.concatenate([streak, np.zeros(padding, dtype=np.int32)])
+        return active, streak
+
+    def update(self, hand_keys, gesture_results):
+        """
+        Advances every hand's gesture states by one frame.
+        :param hand_keys: Key of each hand detected in the frame, in result order.
+        :param gesture_results: (N, G) boolean matrix from GestureEngine.evaluate, or
+                                None if no hand was detected.
+        :return: A list of events, each a dictionary with the hand key, gesture name
+                 and "start" or "end".
+        """
+        names = self.gesture_engine.names
+        detected_by_hand = {}
+        if gesture_results is not None:
+            for hand_key, detected in zip(hand_keys, gesture_results):
+                detected_by_hand[hand_key] = detected
+
+        events = []
+        for hand_key in list(dict.fromkeys([*self._active, *detected_by_hand])):
+            active, streak = self._state(hand_key, len(names))
+            detected = detected_by_hand.get(hand_key)
+            if detected is None:
+                detected = np.zeros(len(names), dtype=bool)
+
+            # Count consecutive frames on which the detection disagreed with the
+            # state, and flip the state once the disagreement has lasted long enough
+            streak = np.where(detected != active, streak + 1, 0)
+            flipped = streak >= self.hold_frames
+            if flipped.any():
+                active = active ^ flipped
+                streak[flipped] = 0
+                for index in np.flatnonzero(flipped):
+                    events.append(
+                        {
+                            "hand": hand_key,
+                            "gesture": names[index],
+                            "event": "start" if active[index] else "end",
+                        }
+                    )
+
+            # Forget hands that left the view once all their gestures have ended
+            if hand_key not in detected_by_hand and not active.any():
+                self._active.pop(hand_key, None)
+                self._streaks.pop(hand_key, None)
+            else:
+                self._active[hand_key] = active
+                self._streaks[hand_key] = streak
+        return events
+
+    def active_results(self):
+        """
+        Returns the started gestures of every tracked hand.
+        :return: An (H, G) boolean matrix in the layout of GestureEngine.evaluate.
+        """
+        gesture_count = len(self.gesture_engine.names)
+        if not self._active:
+            return np.zeros((0, gesture_count), dtype=bool)
+        return np.stack(
+            [self._state(hand_key, gesture_count)[0] for hand_key in self._active]
+        )
+
+    def active_gestures(self, hand_key):
+        """
+        Returns the names of the gestures a hand is currently showing.
+        :param hand_key: Key of the hand.
+        """
+        active = self._active.get(hand_key)
+        if active is None:
+            return []
+        return [name for name, on in zip(self.gesture_engine.names, active) if on]
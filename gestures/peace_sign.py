@@ -1,4 +1,8 @@
 import mediapipe as mp
+import numpy as np
+from gestures.utils import get_hand_features
+from gestures.utils import FINGER_TIPS
+from gestures.utils import FINGER_DIPS
 
 
 mp_hand_landmarks = mp.solutions.hands.HandLandmark
@@ -7,34 +11,36 @@ mp_hand_landmarks = mp.solutions.hands.HandLandmark
 def is_peace_sign(hand_landmarks):
     """
     Determines if the hand is in the "Peace Sign" position.
-    :param hand_landmarks: The landmarks for a single hand.
+    :param hand_landmarks: HandFeatures or the landmarks for a single hand.
     :return: True if in the peace sign position, False otherwise.
     """
-    found_landmarks = hand_landmarks.landmark
+    found_landmarks = get_hand_features(hand_landmarks).landmarks
 
     # Check the y-coordinates of the tips of the index and middle fingers
-    index_tip_y = found_landmarks[mp_hand_landmarks.INDEX_FINGER_TIP].y
-    middle_tip_y = found_landmarks[mp_hand_landmarks.MIDDLE_FINGER_TIP].y
+    index_tip_y = found_landmarks[mp_hand_landmarks.INDEX_FINGER_TIP, 1]
+    middle_tip_y = found_landmarks[mp_hand_landmarks.MIDDLE_FINGER_TIP, 1]
 
     # Check the y-coordinates of the ring and pinky finger tips
-    ring_tip_y = found_landmarks[mp_hand_landmarks.RING_FINGER_TIP].y
-    pinky_tip_y = found_landmarks[mp_hand_landmarks.PINKY_TIP].y
+    ring_tip_y = found_landmarks[mp_hand_landmarks.RING_FINGER_TIP, 1]
+    pinky_tip_y = found_landmarks[mp_hand_landmarks.PINKY_TIP, 1]
 
     # Check if the index and middle fingers are extended
-    index_extended = index_tip_y < found_landmarks[mp_hand_landmarks.INDEX_FINGER_DIP].y
+    index_extended = (
+        index_tip_y < found_landmarks[mp_hand_landmarks.INDEX_FINGER_DIP, 1]
+    )
     middle_extended = (
-        middle_tip_y < found_landmarks[mp_hand_landmarks.MIDDLE_FINGER_DIP].y
+        middle_tip_y < found_landmarks[mp_hand_landmarks.MIDDLE_FINGER_DIP, 1]
     )
 
     # Check if the ring and pinky fingers are curled
-    ring_curled = ring_tip_y > found_landmarks[mp_hand_landmarks.RING_FINGER_DIP].y
-    pinky_curled = pinky_tip_y > found_landmarks[mp_hand_landmarks.PINKY_DIP].y
+    ring_curled = ring_tip_y > found_landmarks[mp_hand_landmarks.RING_FINGER_DIP, 1]
+    pinky_curled = pinky_tip_y > found_landmarks[mp_hand_landmarks.PINKY_DIP, 1]
 
     # Ensure the index and middle fingers have significant gap (different from other gestures)
     index_middle_gap = (
         abs(
-            found_landmarks[mp_hand_landmarks.INDEX_FINGER_TIP].x
-            - found_landmarks[mp_hand_landmarks.MIDDLE_FINGER_TIP].x
+            found_landmarks[mp_hand_landmarks.INDEX_FINGER_TIP, 0]
+            - found_landmarks[mp_hand_landmarks.MIDDLE_FINGER_TIP, 0]
         )
         > 0.05
     )
@@ -47,3 +53,31 @@ def is_peace_sign(hand_landmarks):
         and pinky_curled
         and index_middle_gap
     )
+
+
+def is_peace_sign_batch(hand_features):
+    """
+    Vectorized "Peace Sign" check over a stack of hands.
+    :param hand_features: HandFeatures holding (N, 21, 3) landmarks.
+    :return: An (N,) boolean array, True where the hand shows a peace sign.
+    """
+    found_landmarks = hand_features.landmarks
+    tips_y = found_landmarks[:, FINGER_TIPS, 1]
+    dips_y = found_landmarks[:, FINGER_DIPS, 1]
+
+    # Check if the index and middle fingers are extended
+    fingers_extended = np.all(tips_y[:, :2] < dips_y[:, :2], axis=1)
+
+    # Check if the ring and pinky fingers are curled
+    fingers_curled = np.all(tips_y[:, 2:] > dips_y[:, 2:], axis=1)
+
+    # Ensure the index and middle fingers have significant gap (different from other gestures)
+    index_middle_gap = (
+        np.abs(
+            found_landmarks[:, mp_hand_landmarks.INDEX_FINGER_TIP, 0]
+            - found_landmarks[:, mp_hand_landmarks.MIDDLE_FINGER_TIP, 0]
+        )
+        > 0.05
+    )
+
+    return fingers_extended & fingers_curled & index_middle_gap
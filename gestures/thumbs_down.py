@@ -1,5 +1,7 @@
 import mediapipe as mp
-from gestures.utils import get_relative_positions
+from gestures.utils import get_hand_features
+from gestures.utils import are_fingers_curled_batch
+from gestures.utils import is_thumb_bent_batch
 from gestures.utils import is_palm_facing_camera
 
 
@@ -12,14 +14,15 @@ def is_thumb_down(hand_landmarks):
 
     TODO: Current implementation fails to determine gesture without using camera frame.
 
-    :param hand_landmarks: The landmarks for a single hand.
+    :param hand_landmarks: HandFeatures or the landmarks for a single hand.
     :return: True if thumb is down, False otherwise.
     """
-    relative_positions = get_relative_positions(hand_landmarks)
+    hand_features = get_hand_features(hand_landmarks)
+    relative_positions = hand_features.relative
 
     # Get the absolute Y coordinates of the thumb tip and thumb ip in the camera frame
-    thumb_tip_y = hand_landmarks.landmark[mp_hand_landmarks.THUMB_TIP].y
-    thumb_ip_y = hand_landmarks.landmark[mp_hand_landmarks.THUMB_IP].y
+    thumb_tip_y = hand_features.landmarks[mp_hand_landmarks.THUMB_TIP, 1]
+    thumb_ip_y = hand_features.landmarks[mp_hand_landmarks.THUMB_IP, 1]
 
     # Thumb's up logic: The thumb tip must be above (lower Y) than the thumb IP joint
     thumb_pointing_down = thumb_tip_y >= thumb_ip_y
@@ -56,3 +59,26 @@ def is_thumb_down(hand_landmarks):
         return True
     else:
         return False
+
+
+def is_thumb_down_batch(hand_features):
+    """
+    Vectorized "Thumbs Down" check over a stack of hands.
+
+    :param hand_features: HandFeatures holding (N, 21, 3) landmarks.
+    :return: An (N,) boolean array, True where the thumb is down.
+    """
+    landmarks = hand_features.landmarks
+    relative = hand_features.relative
+
+    # The thumb tip must be at or below (higher Y) the thumb IP joint in the camera frame
+    thumb_pointing_down = (
+        landmarks[:, mp_hand_landmarks.THUMB_TIP, 1]
+        >= landmarks[:, mp_hand_landmarks.THUMB_IP, 1]
+    )
+
+    return (
+        thumb_pointing_down
+        & is_thumb_bent_batch(relative)
+        & are_fingers_curled_batch(relative)
+    )
@@ -1,5 +1,7 @@
 import mediapipe as mp
-from gestures.utils import get_relative_positions
+from gestures.utils import get_hand_features
+from gestures.utils import are_fingers_curled_batch
+from gestures.utils import is_thumb_bent_batch
 from gestures.utils import is_palm_facing_camera
 
 
@@ -10,10 +12,11 @@ def is_thumb_out(hand_landmarks):
     """
     Determines if the thumb is in the "Thumbs Out" position.
 
-    :param hand_landmarks: The landmarks for a single hand.
+    :param hand_landmarks: HandFeatures or the landmarks for a single hand.
     :return: True if thumb is out, False otherwise.
     """
-    relative_positions = get_relative_positions(hand_landmarks)
+    hand_features = get_hand_features(hand_landmarks)
+    relative_positions = hand_features.relative
 
     # Check for bent thumb
     thumb_tip_rel = abs(relative_positions[mp_hand_landmarks.THUMB_TIP])
@@ -44,3 +47,14 @@ def is_thumb_out(hand_landmarks):
         return True
     else:
         return False
+
+
+def is_thumb_out_batch(hand_features):
+    """
+    Vectorized "Thumbs Out" check over a stack of hands.
+
+    :param hand_features: HandFeatures holding (N, 21, 3) landmarks.
+    :return: An (N,) boolean array, True where the thumb is out.
+    """
+    relative = hand_features.relative
+    return is_thumb_bent_batch(relative) & are_fingers_curled_batch(relative)
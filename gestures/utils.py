@@ -3,59 +3,155 @@ import numpy as np
 
 mp_hand_landmarks = mp.solutions.hands.HandLandmark
 
+# Number of landmarks Mediapipe reports for a single hand
+NUM_HAND_LANDMARKS = 21
+
+# Index, middle, ring and pinky landmarks used by the vectorized curl checks
+FINGER_TIPS = [
+    mp_hand_landmarks.INDEX_FINGER_TIP,
+    mp_hand_landmarks.MIDDLE_FINGER_TIP,
+    mp_hand_landmarks.RING_FINGER_TIP,
+    mp_hand_landmarks.PINKY_TIP,
+]
+FINGER_DIPS = [
+    mp_hand_landmarks.INDEX_FINGER_DIP,
+    mp_hand_landmarks.MIDDLE_FINGER_DIP,
+    mp_hand_landmarks.RING_FINGER_DIP,
+    mp_hand_landmarks.PINKY_DIP,
+]
+
+
+class HandFeatures:
+    """
+    Landmark features for one hand, or a stack of hands, computed once per frame
+    and shared by every gesture predicate.
 
-def get_relative_positions(hand_landmarks):
+    landmarks: (21, 3) or (N, 21, 3) float32 array of the raw x, y, z coordinates.
+    relative:  (21, 2) or (N, 21, 2) float32 array of the x, y coordinates in the
+               wrist frame.
     """
-    Converts hand landmark positions to a relative coordinate system centered on the wrist.
+
+    __slots__ = ("landmarks", "relative")
+
+    def __init__(self, landmarks):
+        self.landmarks = np.asarray(landmarks, dtype=np.float32)
+        self.relative = to_wrist_frame(self.landmarks)
+
+    def __len__(self):
+        return len(self.landmarks) if self.landmarks.ndim == 3 else 1
+
+    @classmethod
+    def from_hand_landmarks(cls, hand_landmarks):
+        """
+        Builds the features from a Mediapipe hand landmark list.
+        :param hand_landmarks: The landmarks for a single hand.
+        :return: A HandFeatures instance.
+        """
+        return cls(landmarks_to_array(hand_landmarks))
+
+    @classmethod
+    def from_multi_hand_landmarks(cls, multi_hand_landmarks):
+        """
+        Builds stacked features for every hand detected in a frame.
+        :param multi_hand_landmarks: The landmarks for each detected hand.
+        :return: A HandFeatures instance holding (N, 21, 3) landmarks.
+        """
+        landmarks = np.empty(
+            (len(multi_hand_landmarks), NUM_HAND_LANDMARKS, 3), dtype=np.float32
+        )
+        for i, hand_landmarks in enumerate(multi_hand_landmarks):
+            landmarks[i] = landmarks_to_array(hand_landmarks)
+        return cls(landmarks)
+
+    def hand(self, index):
+        """
+        Returns the features of a single hand from a stack of hands.
+        :param index: Index of the hand in the stack.
+        :return: A HandFeatures instance for that hand.
+        """
+        hand_features = HandFeatures.__new__(HandFeatures)
+        hand_features.landmarks = self.landmarks[index]
+        hand_features.relative = self.relative[index]
+        return hand_features
+
+
+def landmarks_to_array(hand_landmarks):
+    """
+    Copies the landmarks for a single hand into a (21, 3) float32 array.
     :param hand_landmarks: The landmarks for a single hand.
-    :return: A dictionary of relative positions.
+    :return: A (21, 3) array of x, y, z coordinates.
     """
-    """found_landmarks = hand_landmarks.landmark
+    return np.array(
+        [(landmark.x, landmark.y, landmark.z) for landmark in hand_landmarks.landmark],
+        dtype=np.float32,
+    )
 
-    wrist = found_landmarks[mp_hand_landmarks.WRIST]
 
-    # Create a dictionary with relative x and y positions
-    relative_positions = {}
-    for landmark in mp_hand_landmarks:
-        relative_positions[landmark] = {
-            'x': found_landmarks[landmark].x - wrist.x,
-            'y': found_landmarks[landmark].y - wrist.y
-        }
-    return relative_positions"""
-    found_landmarks = hand_landmarks.landmark
+def get_hand_features(hand):
+    """
+    Returns the HandFeatures for a hand, building them if a raw Mediapipe
+    landmark list is given.
+    :param hand: HandFeatures or the landmarks for a single hand.
+    :return: A HandFeatures instance.
+    """
+    if isinstance(hand, HandFeatures):
+        return hand
+    return HandFeatures.from_hand_landmarks(hand)
 
-    # Extract coordinates of key landmarks
-    wrist = found_landmarks[mp_hand_landmarks.WRIST]
-    wrist_array = np.array([wrist.x, wrist.y])
 
-    middle_mcp = found_landmarks[mp_hand_landmarks.MIDDLE_FINGER_MCP]
-    middle_mcp_array = np.array([middle_mcp.x, middle_mcp.y])
+def to_wrist_frame(landmarks):
+    """
+    Converts hand landmark positions to a relative coordinate system centered on the wrist.
+    The y-axis points from the wrist to the middle finger MCP joint.
+    :param landmarks: A (21, 3) or (N, 21, 3) array of landmark coordinates.
+    :return: A (21, 2) or (N, 21, 2) array of relative positions.
+    """
+    points = landmarks[..., :2]
+    wrist = points[..., mp_hand_landmarks.WRIST, :]
 
     # Define the y-axis (wrist to middle MCP)
-    y_axis = middle_mcp_array - wrist_array
-    y_axis /= np.linalg.norm(y_axis)  # Normalize
+    y_axis = points[..., mp_hand_landmarks.MIDDLE_FINGER_MCP, :] - wrist
+    y_axis = y_axis / np.linalg.norm(y_axis, axis=-1, keepdims=True)  # Normalize
 
     # Define the x-axis as perpendicular to the y-axis
     # In 2D, we can get a perpendicular vector by swapping coordinates and inverting one
-    x_axis = np.array([-y_axis[1], y_axis[0]])
+    x_axis = np.stack([-y_axis[..., 1], y_axis[..., 0]], axis=-1)
 
-    # Create a transformation matrix from world to wrist frame
-    transformation_matrix = np.array([x_axis, y_axis]).T  # 2x2 matrix
+    # Transform every landmark to the wrist frame with a single matrix multiply
+    axes = np.stack([x_axis, y_axis], axis=-2)
+    return (points - wrist[..., np.newaxis, :]) @ axes
 
-    # Function to transform a point to the wrist frame
-    def transform_to_wrist_frame(landmark):
-        point_vector = (
-            np.array([found_landmarks[landmark].x, found_landmarks[landmark].y])
-            - wrist_array
-        )
-        relative_vector = transformation_matrix.dot(point_vector)
-        return relative_vector
 
-    relative_positions = {}
-    for landmark in mp_hand_landmarks:
-        relative_positions[landmark] = transform_to_wrist_frame(landmark)
+def get_relative_positions(hand_landmarks):
+    """
+    Converts hand landmark positions to a relative coordinate system centered on the wrist.
+    :param hand_landmarks: HandFeatures or the landmarks for a single hand.
+    :return: A (21, 2) array of relative positions, indexable by HandLandmark.
+    """
+    return get_hand_features(hand_landmarks).relative
+
 
-    return relative_positions
+def is_thumb_bent_batch(relative):
+    """
+    Vectorized thumb bend check over a stack of hands.
+    :param relative: An (N, 21, 2) array of wrist-frame positions.
+    :return: An (N,) boolean array, True where the thumb is bent.
+    """
+    thumb_tip_rel = np.abs(relative[:, mp_hand_landmarks.THUMB_TIP])
+    thumb_ip_rel = np.abs(relative[:, mp_hand_landmarks.THUMB_IP])
+    return thumb_tip_rel[:, 0] > thumb_ip_rel[:, 0]
+
+
+def are_fingers_curled_batch(relative):
+    """
+    Vectorized finger curl check over a stack of hands. A finger is curled when its
+    tip is closer to the wrist along the wrist y-axis than its DIP joint.
+    :param relative: An (N, 21, 2) array of wrist-frame positions.
+    :return: An (N,) boolean array, True where all four fingers are curled.
+    """
+    tips_rel = np.abs(relative[:, FINGER_TIPS, 1])
+    dips_rel = np.abs(relative[:, FINGER_DIPS, 1])
+    return np.all(tips_rel < dips_rel, axis=1)
 
 
 def is_palm_facing_camera(relative_positions):
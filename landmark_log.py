@@ -0,0 +1,344 @@
+import collections
+import os
+import struct
+import time
+import numpy as np
+
+# Identifies landmark logs and the version of their record layout
+MAGIC = b"LMLOG001"
+
+# Frame number, timestamp in seconds, hand count, pose present, face count and
+# landmarks per face, at the start of every record
+RECORD_HEADER = struct.Struct("<IdHHHH")
+
+# Landmarks per hand and per pose, and the values stored for each
+NUM_HAND_LANDMARKS = 21
+NUM_POSE_LANDMARKS = 33
+POSE_VALUES = 4  # x, y, z and visibility
+
+DTYPE = np.float32
+INDEX_DTYPE = np.dtype("<u8")
+INDEX_EXTENSION = ".idx"
+
+# Handedness labels as stored in the log, one byte per hand, padded so the
+# landmark arrays that follow stay aligned for float32 reads
+HANDEDNESS_LABELS = ["Left", "Right"]
+UNKNOWN_HANDEDNESS = 255
+ALIGNMENT = 4
+
+LandmarkRecord = collections.namedtuple(
+    "LandmarkRecord", ["frame", "timestamp", "hands", "handedness", "pose", "faces"]
+)
+LandmarkRecord.__doc__ = """
+One frame of a landmark log.
+
+frame:      Frame number.
+timestamp:  Time of the frame in seconds: its position in the video for offline
+            recordings, or the time since recording started for live ones.
+hands:      (N, 21, 3) float32 array of the x, y, z coordinates of each hand.
+handedness: List of the "Left" or "Right" label of each hand, or None.
+pose:       (33, 4) float32 array of the x, y, z and visibility of each pose
+            landmark, or None if no pose was detected.
+faces:      (F, L, 3) float32 array of the x, y, z coordinates of each face.
+"""
+
+
+def index_path(log_path):
+    """
+    Returns the path of the frame index of a landmark log.
+    """
+    return log_path + INDEX_EXTENSION
+
+
+def handedness_size(hand_count):
+    """
+    Returns the size in bytes of the padded handedness codes of a record.
+    """
+    return -(-hand_count // ALIGNMENT) * ALIGNMENT
+
+
+def record_size(header):
+    """
+    Returns the size in bytes of a record, header included.
+    :param header: The unpacked RECORD_HEADER of the record.
+    """
+    _, _, hand_count, has_pose, face_count, face_landmarks = header
+    values = (
+        hand_count * NUM_HAND_LANDMARKS * 3
+        + has_pose * NUM_POSE_LANDMARKS * POSE_VALUES
+        + face_count * face_landmarks * 3
+    )
+    return (
+        RECORD_HEADER.size
+        + handedness_size(hand_count)
+        + values * np.dtype(DTYPE).itemsize
+    )
+
+
+def landmark_lists_to_array(landmark_lists, values=3):
+    """
+    Copies Mediapipe landmark lists into one float32 array.
+    :param landmark_lists: The landmark lists, all with the same number of landmarks.
+    :param values: 3 for x, y, z, or 4 to also copy the visibility.
+    :return: An (N, L, values) array.
+    """
+    if values == 4:
+        rows = [
+            [(lm.x, lm.y, lm.z, lm.visibility) for lm in landmark_list.landmark]
+            for landmark_list in landmark_lists
+        ]
+    else:
+        rows = [
+            [(lm.x, lm.y, lm.z) for lm in landmark_list.landmark]
+            for landmark_list in landmark_lists
+        ]
+    return np.array(rows, dtype=DTYPE).reshape(len(rows), -1, values)
+
+
+def repair_log(path):
+    """
+    Prepares an existing landmark log for appending: drops a record cut short by a
+    crash and rewrites the index to match the complete records.
+    :param path: Path of the landmark log.
+    """
+    reader = LandmarkLogReader(path)
+    offsets, end_offset = reader.offsets, reader.end_offset
+    del reader  # Release the memory map before truncating the file
+
+    if os.path.getsize(path) > end_offset:
+        os.truncate(path, end_offset)
+    with open(index_path(path), "wb") as index_file:
+        index_file.write(offsets.tobytes())
+
+
+class LandmarkLogWriter:
+    """
+    Appends per-frame hand, pose and face landmarks to a compact binary log.
+
+    Each record is a small header followed by the raw float32 landmark arrays, so a
+    frame with two hands and one face takes about 6 KB. The byte offset of every
+    record goes to a separate frame index, which lets a reader jump to any frame
+    without scanning the log. Opening an existing log appends to it.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        if os.path.exists(path) and os.path.getsize(path):
+            repair_log(path)
+        self._log_file = open(path, "ab")
+        if self._log_file.tell() == 0:
+            self._log_file.write(MAGIC)
+        self._index_file = open(index_path(path), "ab")
+
+    def write(
+        self, frame, timestamp, hands=None, handedness=None, pose=None, faces=None
+    ):
+        """
+        Appends the landmarks of one frame.
+        :param frame: Frame number.
+        :param timestamp: Time of the frame in seconds.
+        :param hands: (N, 21, 3) array of hand landmarks, or None.
+        :param handedness: "Left" or "Right" label of each hand, or None.
+        :param pose: (33, 4) array of pose landmarks and visibilities, or None.
+        :param faces: (F, L, 3) array of face landmarks, or None.
+        """
+        hands = np.empty((0, NUM_HAND_LANDMARKS, 3), DTYPE) if hands is None else hands
+        faces = np.empty((0, 0, 3), DTYPE) if faces is None else faces
+        handedness_codes = bytes(
+            (
+                HANDEDNESS_LABELS.index(label)
+                if handedness and label in HANDEDNESS_LABELS
+                else UNKNOWN_HANDEDNESS
+            )
+            for label in (handedness or [None] * len(hands))
+        ).ljust(handedness_size(len(hands)), b"\0")
+
+        offset = self._log_file.tell()
+        self._log_file.write(
+            RECORD_HEADER.pack(
+                frame,
+                timestamp,
+                len(hands),
+                pose is not None,
+                len(faces),
+                faces.shape[1] if len(faces) else 0,
+            )
+        )
+        self._log_file.write(handedness_codes)
+        self._log_file.write(np.ascontiguousarray(hands, dtype=DTYPE).tobytes())
+        if pose is not None:
+            self._log_file.write(np.ascontiguousarray(pose, dtype=DTYPE).tobytes())
+        self._log_file.write(np.ascontiguousarray(faces, dtype=DTYPE).tobytes())
+
+        # The index entry goes last, so it never points at a partial record
+        self._index_file.write(np.array([offset], dtype=INDEX_DTYPE).tobytes())
+
+    def close(self):
+        self._log_file.close()
+        self._index_file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class LandmarkRecorder:
+    """
+    Records the landmarks the enabled tracker pipelines report for every frame.
+    Recording to an existing log continues its frame numbers and timestamps, one
+    frame interval after its last record.
+    """
+
+    def __init__(self, path):
+        self.frame_count = 0
+        self.timestamp_offset = 0.0
+        if os.path.exists(path) and os.path.getsize(path):
+            reader = LandmarkLogReader(path)
+            if len(reader):
+                last_record = reader[-1]
+                frame_interval = 0.0
+                if len(reader) > 1:
+                    frame_interval = last_record.timestamp - reader[-2].timestamp
+                self.frame_count = last_record.frame + 1
+                self.timestamp_offset = last_record.timestamp + max(frame_interval, 0.0)
+            del reader  # Release the memory map before the writer repairs the log
+
+        self.writer = LandmarkLogWriter(path)
+        self._start_time = time.perf_counter()
+
+    def record(self, trackers_pipeline, timestamp=None):
+        """
+        Appends the landmarks of the frame the pipelines last processed.
+        :param trackers_pipeline: The TrackersPipeline that processed the frame.
+        :param timestamp: Time of the frame in seconds since recording started,
+                          such as its position in a video. Defaults to the time
+                          since the recorder was created.
+        """
+        pipelines = trackers_pipeline.enabled_pipelines()
+        hands = handedness = pose = faces = None
+
+        hand_pipeline = pipelines.get("hand")
+        if hand_pipeline is not None and hand_pipeline.landmark_lists():
+            hands = landmark_lists_to_array(hand_pipeline.landmark_lists())
+            handedness = hand_pipeline.handedness_labels()
+
+        body_pipeline = pipelines.get("body")
+        if body_pipeline is not None and body_pipeline.landmark_lists():
+            pose = landmark_lists_to_array(body_pipeline.landmark_lists(), values=4)[0]
+
+        face_pipeline = pipelines.get("face")
+        if face_pipeline is not None and face_pipeline.landmark_lists():
+            faces = landmark_lists_to_array(face_pipeline.landmark_lists())
+
+        if timestamp is None:
+            timestamp = time.perf_counter() - self._start_time
+        self.writer.write(
+            self.frame_count,
+            self.timestamp_offset + timestamp,
+            hands,
+            handedness,
+            pose,
+            faces,
+        )
+        self.frame_count += 1
+
+    def close(self):
+        self.writer.close()
+
+
+class LandmarkLogReader:
+    """
+    Reads a landmark log through a memory map, so records are decoded straight
+    from the page cache without copying the landmark arrays.
+
+    Records missing from the index, because it was lost or the recording stopped
+    between writing a record and its index entry, are found by scanning the log
+    past the last indexed record. A record cut short by a crash is ignored.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as log_file:
+            if log_file.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"{path} is not a landmark log.")
+        self._data = np.memmap(path, dtype=np.uint8, mode="r")
+
+        offsets = np.empty(0, dtype=INDEX_DTYPE)
+        if os.path.exists(index_path(path)):
+            with open(index_path(path), "rb") as index_file:
+                index = index_file.read()
+            index = index[: len(index) - len(index) % INDEX_DTYPE.itemsize]
+            offsets = np.frombuffer(index, dtype=INDEX_DTYPE)
+
+            # Only the last indexed record can have been cut short
+            while len(offsets) and self._record_end(int(offsets[-1])) is None:
+                offsets = offsets[:-1]
+
+        start = self._record_end(int(offsets[-1])) if len(offsets) else len(MAGIC)
+        self.offsets = np.concatenate([offsets, self.scan_offsets(start)])
+
+    @property
+    def end_offset(self):
+        """Offset just past the last complete record."""
+        if not len(self.offsets):
+            return len(MAGIC)
+        return self._record_end(int(self.offsets[-1]))
+
+    def scan_offsets(self, offset):
+        """
+        Finds the offsets of the complete records by walking the log.
+        :param offset: Offset of the first record to walk from.
+        :return: An array of record offsets.
+        """
+        offsets = []
+        end = self._record_end(offset)
+        while end is not None:
+            offsets.append(offset)
+            offset = end
+            end = self._record_end(offset)
+        return np.array(offsets, dtype=INDEX_DTYPE)
+
+    def _record_end(self, offset):
+        # Offset just past the record at offset, or None if it is not complete
+        if offset + RECORD_HEADER.size > len(self._data):
+            return None
+        end = offset + record_size(RECORD_HEADER.unpack_from(self._data, offset))
+        return end if end <= len(self._data) else None
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def __getitem__(self, index):
+        """
+        Decodes one record.
+        :param index: Position of the record in the log.
+        :return: A LandmarkRecord whose arrays are read-only views of the log.
+        """
+        offset = int(self.offsets[index])
+        header = RECORD_HEADER.unpack_from(self._data, offset)
+        frame, timestamp, hand_count, has_pose, face_count, face_landmarks = header
+        offset += RECORD_HEADER.size
+
+        handedness = None
+        codes = self._data[offset : offset + hand_count].tolist()
+        if hand_count and UNKNOWN_HANDEDNESS not in codes:
+            handedness = [HANDEDNESS_LABELS[code] for code in codes]
+        offset += handedness_size(hand_count)
+
+        hands, offset = self._read_array(offset, (hand_count, NUM_HAND_LANDMARKS, 3))
+        pose = None
+        if has_pose:
+            pose, offset = self._read_array(offset, (NUM_POSE_LANDMARKS, POSE_VALUES))
+        faces, offset = self._read_array(offset, (face_count, face_landmarks, 3))
+        return LandmarkRecord(frame, timestamp, hands, handedness, pose, faces)
+
+    def _read_array(self, offset, shape):
+        count = int(np.prod(shape))
+        array = np.frombuffer(self._data, dtype=DTYPE, count=count, offset=offset)
+        return array.reshape(shape), offset + count * np.dtype(DTYPE).itemsize
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
@@ -0,0 +1,172 @@
+import argparse
+import collections
+import json
+import time
+from gestures.engine import create_default_gesture_engine
+from gestures.gesture_classifier import GestureClassifier
+from gestures.gesture_tracker import HOLD_FRAMES
+from gestures.gesture_tracker import GestureTracker
+from gestures.gesture_tracker import hand_keys
+from gestures.utils import HandFeatures
+from facial_expressions.smiling import is_smiling
+from landmark_log import LandmarkLogReader
+
+
+class ArrayLandmark:
+    """Stand-in for a Mediapipe NormalizedLandmark backed by a row of an array."""
+
+    __slots__ = ("x", "y", "z")
+
+    def __init__(self, point):
+        self.x, self.y, self.z = point[0], point[1], point[2]
+
+
+class ArrayLandmarks:
+    """
+    Stand-in for the landmark field of a Mediapipe NormalizedLandmarkList.
+    Landmarks are only created for the indices that are looked up.
+    """
+
+    __slots__ = ("points",)
+
+    def __init__(self, points):
+        self.points = points
+
+    def __len__(self):
+        return len(self.points)
+
+    def __getitem__(self, index):
+        return ArrayLandmark(self.points[index].tolist())
+
+
+class ArrayLandmarkList:
+    """Stand-in for a Mediapipe NormalizedLandmarkList backed by an (L, 3) array."""
+
+    __slots__ = ("landmark",)
+
+    def __init__(self, points):
+        self.landmark = ArrayLandmarks(points)
+
+
+class LandmarkReplay:
+    """
+    Feeds recorded landmarks to the gesture engine, gesture tracker and facial
+    expression checks, with no camera and no model inference.
+    """
+
+    def __init__(self, gesture_engine=None, gesture_hold_frames=HOLD_FRAMES):
+        self.gesture_engine = gesture_engine or create_default_gesture_engine()
+        self.gesture_tracker = GestureTracker(self.gesture_engine, gesture_hold_frames)
+
+        self.frame_count = 0
+        self.gesture_frames = collections.Counter()  # Gesture -> frames detected
+        self.gesture_events = collections.Counter()  # (gesture, event) -> count
+        self.smiling_frames = 0
+
+    def process(self, record):
+        """
+        Evaluates the gestures and expressions of one recorded frame.
+        :param record: A LandmarkRecord.
+        :return: The results of the frame as plain Python data.
+        """
+        keys = hand_keys(len(record.hands), record.handedness)
+        gesture_results = None
+        if len(record.hands):
+            gesture_results = self.gesture_engine.evaluate(
+                HandFeatures(record.hands), record.handedness
+            )
+            for name, count in zip(
+                self.gesture_engine.names, gesture_results.sum(axis=0).tolist()
+            ):
+                self.gesture_frames[name] += count
+        events = self.gesture_tracker.update(keys, gesture_results)
+        for event in events:
+            self.gesture_events[(event["gesture"], event["event"])] += 1
+
+        smiling = [is_smiling(ArrayLandmarkList(face)) for face in record.faces]
+        self.smiling_frames += any(smiling)
+        self.frame_count += 1
+
+        return {
+            "frame": record.frame,
+            "hand": [
+                {
+                    "handedness": record.handedness[i] if record.handedness else None,
+                    "gestures": self.gesture_tracker.active_gestures(key),
+                }
+                for i, key in enumerate(keys)
+            ],
+            "face": [
+                {"expressions": ["smiling"] if face_smiling else []}
+                for face_smiling in smiling
+            ],
+            "gesture_events": events,
+        }
+
+    def run(self, reader, output_file=None):
+        """
+        Replays every record of a landmark log.
+        :param reader: A LandmarkLogReader.
+        :param output_file: Optional file the results of every frame are written to
+                            as JSON Lines.
+        :return: The number of frames replayed and the frames per second achieved.
+        """
+        start_time = time.perf_counter()
+        for record in reader:
+            frame_results = self.process(record)
+            if output_file is not None:
+                output_file.write(json.dumps(frame_results) + "\n")
+
+        elapsed = time.perf_counter() - start_time
+        fps = self.frame_count / elapsed if elapsed > 0 else 0.0
+        return self.frame_count, fps
+
+    def summary(self):
+        """Returns a description of the gestures and expressions seen in the replay."""
+        gestures = ", ".join(
+            f"{name} on {frames} hand frames "
+            f"({self.gesture_events[(name, 'start')]} starts)"
+            for name, frames in self.gesture_frames.items()
+        )
+        return (
+            f"Gestures: {gestures or 'none'}. "
+            f"Smiling on {self.smiling_frames} of {self.frame_count} frames."
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Replay a landmark log through the gesture and expression logic."
+    )
+    parser.add_argument("log", help="Landmark log written by the recorder")
+    parser.add_argument(
+        "-o", "--output", default=None, help="Optional output JSON Lines file"
+    )
+    parser.add_argument(
+        "--hold-frames",
+        type=int,
+        default=HOLD_FRAMES,
+        help="Frames a gesture must hold before it starts or ends",
+    )
+    parser.add_argument(
+        "--classifier", default=None, help="Also evaluate a trained gesture classifier"
+    )
+    args = parser.parse_args()
+
+    gesture_engine = create_default_gesture_engine()
+    if args.classifier:
+        gesture_engine.register_classifier(GestureClassifier.load(args.classifier))
+
+    reader = LandmarkLogReader(args.log)
+    replay = LandmarkReplay(gesture_engine, args.hold_frames)
+    if args.output:
+        with open(args.output, "w") as output_file:
+            frame_count, fps = replay.run(reader, output_file)
+    else:
+        frame_count, fps = replay.run(reader)
+    print(f"Replayed {frame_count} frames at {fps:.1f} FPS.")
+    print(replay.summary())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+import json
+import threading
+import time
+import cv2
+import numpy as np
+
+# Percentiles reported for every stage
+PERCENTILES = (50, 95, 99)
+
+# Overlay text settings
+OVERLAY_FONT = cv2.FONT_HERSHEY_SIMPLEX
+OVERLAY_FONT_SCALE = 0.4
+OVERLAY_COLOR = (0, 255, 255)  # Yellow
+OVERLAY_ORIGIN = (10, 150)
+OVERLAY_LINE_HEIGHT = 15
+
+
+class _NullStage:
+    """Context manager returned while the monitor is disabled; does nothing."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+
+_NULL_STAGE = _NullStage()
+
+
+class _Stage:
+    """Context manager that times one execution of a stage."""
+
+    __slots__ = ("_monitor", "_name", "_start")
+
+    def __init__(self, monitor, name):
+        self._monitor = monitor
+        self._name = name
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self._monitor.record(self._name, time.perf_counter() - self._start)
+        return False
+
+
+class LatencyMonitor:
+    """
+    Keeps the most recent latencies of each named stage of the frame loop in
+    fixed-size buffers and reports rolling p50/p95/p99 figures.
+
+    While disabled, stage() returns a shared no-op context manager so the
+    instrumentation costs a single attribute check.
+    """
+
+    def __init__(self, window_size=300):
+        self.enabled = False
+        self._window_size = window_size
+        self._samples = {}  # Stage name -> ring buffer of latencies in seconds
+        self._counts = {}  # Stage name -> number of samples recorded
+        self._lock = threading.Lock()
+
+        self._dump_path = None
+        self._dump_interval = None
+        self._last_dump_time = time.perf_counter()
+
+    def configure(
+        self, enabled=True, window_size=300, dump_path=None, dump_interval=10.0
+    ):
+        """
+        Enables or disables the monitor and clears any recorded samples.
+        :param enabled: Whether stage timings are recorded.
+        :param window_size: Number of recent samples kept for each stage.
+        :param dump_path: JSON file that maybe_dump writes to, or None.
+        :param dump_interval: Seconds between two dumps.
+        """
+        with self._lock:
+            self.enabled = enabled
+            self._window_size = window_size
+            self._samples.clear()
+            self._counts.clear()
+        self._dump_path = dump_path
+        self._dump_interval = dump_interval
+        self._last_dump_time = time.perf_counter()
+
+    def stage(self, name):
+        """
+        Returns a context manager that times the enclosed block as the named stage.
+        :param name: Name of the stage, e.g. "capture" or "hand.inference".
+        """
+        if not self.enabled:
+            return _NULL_STAGE
+        return _Stage(self, name)
+
+    def record(self, name, seconds):
+        """
+        Records one latency sample for a stage.
+        :param name: Name of the stage.
+        :param seconds: Measured latency in seconds.
+        """
+        with self._lock:
+            samples = self._samples.get(name)
+            if samples is None:
+                samples = np.zeros(self._window_size, dtype=np.float64)
+                self._samples[name] = samples
+                self._counts[name] = 0
+            samples[self._counts[name] % self._window_size] = seconds
+            self._counts[name] += 1
+
+    def percentiles(self):
+        """
+        Computes the rolling percentiles of every stage.
+        :return: A dictionary of stage name to count and p50/p95/p99 in milliseconds.
+        """
+        with self._lock:
+            snapshot = {
+                name: samples[: min(self._counts[name], self._window_size)].copy()
+                for name, samples in self._samples.items()
+            }
+            counts = dict(self._counts)
+
+        stats = {}
+        for name, samples in snapshot.items():
+            values = np.percentile(samples, PERCENTILES) * 1000.0
+            stats[name] = {"count": counts[name]}
+            for percentile, value in zip(PERCENTILES, values):
+                stats[name][f"p{percentile}_ms"] = round(float(value), 3)
+        return stats
+
+    def draw_overlay(self, image):
+        """
+        Draws the rolling percentiles of every stage onto the image.
+        :param image: The frame to draw on.
+        """
+        x, y = OVERLAY_ORIGIN
+        for name, stats in sorted(self.percentiles().items()):
+            text = (
+                f"{name}: p50 {stats['p50_ms']:.1f} "
+                f"p95 {stats['p95_ms']:.1f} p99 {stats['p99_ms']:.1f} ms"
+            )
+            cv2.putText(
+                image,
+                text,
+                (x, y),
+                OVERLAY_FONT,
+                OVERLAY_FONT_SCALE,
+                OVERLAY_COLOR,
+                1,
+                cv2.LINE_AA,
+            )
+            y += OVERLAY_LINE_HEIGHT
+
+    def dump_json(self, path):
+        """
+        Writes the rolling percentiles of every stage to a JSON file.
+        :param path: Path of the JSON file.
+        """
+        with open(path, "w") as dump_file:
+            json.dump(
+                {"timestamp": time.time(), "stages": self.percentiles()},
+                dump_file,
+                indent=4,
+            )
+
+    def maybe_dump(self):
+        """Writes the JSON dump if enabled and the dump interval has elapsed."""
+        if not self.enabled or self._dump_path is None:
+            return
+        now = time.perf_counter()
+        if now - self._last_dump_time >= self._dump_interval:
+            self._last_dump_time = now
+            self.dump_json(self._dump_path)
+
+
+# Shared monitor used by the controller and the tracker pipelines
+latency_monitor = LatencyMonitor()
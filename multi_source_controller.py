@@ -0,0 +1,340 @@
+import argparse
+import collections
+import functools
+import json
+import os
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+import cv2
+import numpy as np
+from frame_capture import FrameCapture
+from offline_processor import iter_image_frames
+from trackers_pipeline import TrackersPipeline
+from tracker_pipelines.overlay import Overlay
+
+# Number of preallocated frames in each source's capture ring buffer
+CAPTURE_BUFFER_SIZE = 3
+
+# Frame rate recorded sources are played back at when they do not specify one
+DEFAULT_SOURCE_FPS = 30.0
+
+# Longest time the scheduler waits before checking the sources for new frames
+SCHEDULER_POLL_SECONDS = 0.002
+
+# Number of recent frame latencies kept for each source's statistics
+LATENCY_WINDOW_SIZE = 300
+
+
+def read_next_frame(frames):
+    # Adapt a frame iterator to the cv2.VideoCapture read interface
+    frame = next(frames, None)
+    return frame is not None, frame
+
+
+class PacedCapture:
+    """
+    Delivers the frames of a recorded source at a fixed frame rate through the
+    cv2.VideoCapture read interface, so video files and folders of frames behave
+    like live cameras when captured with FrameCapture.
+    """
+
+    def __init__(self, read_frame, fps, release=None):
+        """
+        :param read_frame: Callable returning a (ret, frame) tuple.
+        :param fps: Frame rate to deliver frames at.
+        :param release: Optional callable releasing the underlying source.
+        """
+        self._read_frame = read_frame
+        self._interval = 1.0 / fps
+        self._release = release
+        self._next_frame_time = None
+
+    def read(self, image=None):
+        ret, frame = self._read_frame()
+        if not ret:
+            return False, None
+
+        # Wait for the frame's slot in the schedule, without bursting to catch up
+        now = time.perf_counter()
+        if self._next_frame_time is not None and self._next_frame_time > now:
+            time.sleep(self._next_frame_time - now)
+            now = self._next_frame_time
+        self._next_frame_time = now + self._interval
+        return True, frame
+
+    def release(self):
+        if self._release is not None:
+            self._release()
+
+
+def open_source(source):
+    """
+    Opens a camera, video file or folder of frames for capture.
+    :param source: A camera index (an int or a string of digits), a video file path
+                   or a directory of images.
+    :return: An object with the read and release methods of cv2.VideoCapture.
+    """
+    if isinstance(source, int) or str(source).isdigit():
+        cap = cv2.VideoCapture(int(source))
+        if not cap.isOpened():
+            raise IOError(f"Failed to open camera {source}")
+        return cap
+
+    if os.path.isdir(source):
+        frames = iter_image_frames(source)
+        return PacedCapture(
+            functools.partial(read_next_frame, frames), DEFAULT_SOURCE_FPS
+        )
+
+    cap = cv2.VideoCapture(source)
+    if not cap.isOpened():
+        raise IOError(f"Failed to open video file: {source}")
+    fps = cap.get(cv2.CAP_PROP_FPS) or DEFAULT_SOURCE_FPS
+    return PacedCapture(cap.read, fps, cap.release)
+
+
+class Source:
+    """
+    A frame source with its own capture thread, trackers pipeline and statistics.
+
+    Mediapipe's tracking models keep state between the frames of a stream, so each
+    source needs its own pipelines; only the worker threads are shared.
+    """
+
+    def __init__(self, name, cap, config):
+        self.name = name
+        self.cap = cap
+        self.frame_capture = FrameCapture(cap, CAPTURE_BUFFER_SIZE)
+        self.trackers_pipeline = TrackersPipeline(config)
+
+        self.busy = False  # A worker is processing one of its frames
+        self.finished = False  # The source delivers no more frames
+        self.display_frame = None  # Latest rendered frame, when not headless
+
+        self.processed_frames = 0
+        self.failed_frames = 0
+        self.latencies = collections.deque(maxlen=LATENCY_WINDOW_SIZE)
+        self._stopped = False
+
+    def stop(self):
+        """Stops the capture thread and releases the source and its pipelines, once."""
+        if self._stopped:
+            return
+        self._stopped = True
+        self.frame_capture.stop()
+        self.cap.release()
+        self.trackers_pipeline.stop()
+
+
+class MultiSourceController:
+    """
+    Serves several cameras or recorded streams from one process.
+
+    Frames are dispatched to a shared pool of worker threads. The scheduler visits
+    the sources round-robin and hands each worker the newest frame of the next
+    source that is idle, so every source gets an equal share of the workers no
+    matter how fast it delivers frames. A source has at most one frame in flight,
+    which keeps its results in order.
+    """
+
+    def __init__(
+        self, sources, config, num_workers=None, headless=False, on_results=None
+    ):
+        """
+        :param sources: Camera indices, video file paths or directories of images.
+        :param config: The parsed config.json.
+        :param num_workers: Number of worker threads, defaults to one per source up
+                            to the number of CPUs.
+        :param headless: Skip rendering and display and only emit results.
+        :param on_results: Optional callback receiving the source name and the
+                           pipeline results of every processed frame.
+        """
+        # Name sources after their path or index, numbering repeated ones
+        names = [str(source) for source in sources]
+        self.sources = [
+            Source(
+                name if names.count(name) == 1 else f"{name}#{index}",
+                open_source(source),
+                config,
+            )
+            for index, (name, source) in enumerate(zip(names, sources))
+        ]
+        self.num_workers = num_workers or min(len(self.sources), os.cpu_count() or 1)
+        self.executor = ThreadPoolExecutor(
+            max_workers=self.num_workers, thread_name_prefix="source"
+        )
+        self.headless = headless
+        self.on_results = on_results
+
+        self._condition = threading.Condition()
+        self._in_flight = 0
+        self._next_source = 0  # Where the next round-robin pass starts
+        self._start_time = None
+        self.stop_signal = False
+
+    def next_frame(self):
+        """
+        Takes the newest frame of the next idle source, in round-robin order.
+        Must be called with the condition held.
+        :return: A (source, frame) tuple, or (None, None) if no source has a frame.
+        """
+        for offset in range(len(self.sources)):
+            index = (self._next_source + offset) % len(self.sources)
+            source = self.sources[index]
+            if source.busy or source.finished:
+                continue
+
+            ret, frame = source.frame_capture.read(timeout=0)
+            if not ret:
+                if source.frame_capture.failed:
+                    source.finished = True
+                continue
+
+            self._next_source = index + 1
+            return source, frame
+        return None, None
+
+    def run(self):
+        """Dispatches frames until every source has finished or 'q' is pressed."""
+        for source in self.sources:
+            source.frame_capture.start()
+        self._start_time = time.perf_counter()
+
+        while not self.stop_signal:
+            with self._condition:
+                while self._in_flight < self.num_workers:
+                    source, frame = self.next_frame()
+                    if source is None:
+                        break
+                    source.busy = True
+                    self._in_flight += 1
+                    self.executor.submit(self.process, source, frame)
+
+                if self._in_flight == 0 and all(
+                    source.finished for source in self.sources
+                ):
+                    break
+
+                # Wake up when a worker finishes, or poll for new frames
+                self._condition.wait(SCHEDULER_POLL_SECONDS)
+
+            # OpenCV windows must be updated from the main thread
+            if not self.headless:
+                self.display()
+
+        self.stop()
+
+    def process(self, source, frame):
+        """Runs a source's pipelines on one of its frames, on a worker thread."""
+        start_time = time.perf_counter()
+        try:
+            overlay = None if self.headless else Overlay()
+            results = source.trackers_pipeline.process_frame(frame, overlay)
+            if self.on_results is not None:
+                self.on_results(source.name, results)
+
+            # The frame stays ours until the source is read again, which only
+            # happens once this worker is done
+            if overlay is not None:
+                overlay.render(frame)
+                source.display_frame = frame.copy()
+            source.latencies.append(time.perf_counter() - start_time)
+            source.processed_frames += 1
+        except Exception:
+            # Give up on the source, but keep serving the others
+            print(f"Source {source.name} failed:")
+            traceback.print_exc()
+            source.failed_frames += 1
+            source.finished = True
+            source.stop()
+        finally:
+            with self._condition:
+                source.busy = False
+                self._in_flight -= 1
+                self._condition.notify_all()
+
+    def display(self):
+        # Show the latest rendered frame of every source in its own window
+        for source in self.sources:
+            if source.display_frame is not None:
+                cv2.imshow(f"Source {source.name}", source.display_frame)
+        if cv2.waitKey(1) & 0xFF == ord("q"):
+            self.stop_signal = True
+
+    def statistics(self):
+        """
+        Returns the capture and processing statistics of every source.
+        :return: A dictionary of source name to its statistics.
+        """
+        elapsed = time.perf_counter() - self._start_time if self._start_time else 0.0
+        statistics = {}
+        for source in self.sources:
+            latencies = np.array(source.latencies) * 1000.0
+            statistics[source.name] = {
+                "captured_frames": source.frame_capture.captured_frames,
+                "dropped_frames": source.frame_capture.dropped_frames,
+                "processed_frames": source.processed_frames,
+                "failed_frames": source.failed_frames,
+                "fps": source.processed_frames / elapsed if elapsed > 0 else 0.0,
+                "p50_ms": (
+                    float(np.percentile(latencies, 50)) if len(latencies) else 0.0
+                ),
+                "p95_ms": (
+                    float(np.percentile(latencies, 95)) if len(latencies) else 0.0
+                ),
+            }
+        return statistics
+
+    def stop(self):
+        """Waits for in-flight frames, then stops every source and its pipelines."""
+        self.stop_signal = True
+        self.executor.shutdown(wait=True)
+        for source in self.sources:
+            source.stop()
+        if not self.headless:
+            cv2.destroyAllWindows()
+
+        for name, stats in self.statistics().items():
+            print(
+                f"Source {name}: processed {stats['processed_frames']} of "
+                f"{stats['captured_frames']} captured frames "
+                f"({stats['dropped_frames']} dropped, {stats['failed_frames']} failed) "
+                f"at {stats['fps']:.1f} FPS, "
+                f"p50 {stats['p50_ms']:.1f} ms, p95 {stats['p95_ms']:.1f} ms."
+            )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Run the tracker pipelines on several cameras or streams at once."
+    )
+    parser.add_argument(
+        "sources", nargs="+", help="Camera indices, video files or folders of frames"
+    )
+    parser.add_argument(
+        "-w", "--workers", type=int, default=None, help="Number of worker threads"
+    )
+    parser.add_argument(
+        "-c", "--config", default="config.json", help="Path to config.json"
+    )
+    parser.add_argument(
+        "--headless", action="store_true", help="Do not render or display frames"
+    )
+    args = parser.parse_args()
+
+    with open(args.config, "r") as config_file:
+        config = json.load(config_file)
+
+    headless = args.headless or config.get("controller", {}).get("headless", False)
+    controller = MultiSourceController(args.sources, config, args.workers, headless)
+    try:
+        controller.run()
+    except KeyboardInterrupt:
+        print("Stopping trackers...")
+        controller.stop()
+
+
+if __name__ == "__main__":
+    main()
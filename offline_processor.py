@@ -0,0 +1,189 @@
+import argparse
+import json
+import os
+import queue
+import threading
+import time
+import cv2
+from landmark_log import LandmarkRecorder
+from trackers_pipeline import TrackersPipeline
+
+# Image extensions accepted when the source is a directory of frames
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".bmp")
+
+# Number of decoded frames buffered ahead of the pipelines
+PREFETCH_SIZE = 8
+
+# Frame rate assumed for directories of frames, and videos that do not report one
+DEFAULT_SOURCE_FPS = 30.0
+
+
+def iter_video_frames(video_path):
+    """
+    Yields every frame of a video file, in order.
+    :param video_path: Path to the video file.
+    """
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise IOError(f"Failed to open video file: {video_path}")
+    try:
+        while True:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            yield frame
+    finally:
+        cap.release()
+
+
+def iter_image_frames(folder_path):
+    """
+    Yields every image in a directory as a frame, in file name order.
+    :param folder_path: Path to the directory of frames.
+    """
+    image_files = sorted(
+        f for f in os.listdir(folder_path) if f.lower().endswith(IMAGE_EXTENSIONS)
+    )
+    for image_file in image_files:
+        frame = cv2.imread(os.path.join(folder_path, image_file))
+        if frame is None:
+            print(f"Failed to load image {image_file}, skipping.")
+            continue
+        yield frame
+
+
+def iter_frames(source):
+    """
+    Yields the frames of a video file or a directory of images.
+    :param source: Path to a video file or a directory of images.
+    """
+    if os.path.isdir(source):
+        return iter_image_frames(source)
+    return iter_video_frames(source)
+
+
+def source_fps(source):
+    """
+    Returns the frame rate of a source, used to place its frames in time.
+    :param source: Path to a video file or a directory of images.
+    :return: The video's frame rate, or DEFAULT_SOURCE_FPS for directories and
+             videos that do not report one.
+    """
+    if os.path.isdir(source):
+        return DEFAULT_SOURCE_FPS
+    cap = cv2.VideoCapture(source)
+    try:
+        return cap.get(cv2.CAP_PROP_FPS) or DEFAULT_SOURCE_FPS
+    finally:
+        cap.release()
+
+
+def prefetch(frames, size=PREFETCH_SIZE):
+    """
+    Decodes frames on a background thread so decoding overlaps with inference.
+    :param frames: Iterator of frames.
+    :param size: Maximum number of decoded frames held in memory.
+    """
+    frame_queue = queue.Queue(maxsize=size)
+    end = object()
+    errors = []
+
+    def decode():
+        try:
+            for frame in frames:
+                frame_queue.put(frame)
+        except Exception as e:
+            errors.append(e)
+        finally:
+            frame_queue.put(end)
+
+    threading.Thread(target=decode, daemon=True).start()
+    while True:
+        frame = frame_queue.get()
+        if frame is end:
+            break
+        yield frame
+    if errors:
+        raise errors[0]
+
+
+class OfflineProcessor:
+    """
+    Runs the TrackersPipeline over recorded video files or directories of frames as
+    fast as possible, with no camera or display, and writes the results of every
+    frame as one JSON object per line.
+    """
+
+    def __init__(self, config):
+        self.trackers_pipeline = TrackersPipeline(config)
+
+    def process(self, source, output_path, record_path=None):
+        """
+        Processes every frame of the source and writes the results to output_path.
+        :param source: Path to a video file or a directory of images.
+        :param output_path: Path of the JSON Lines file to write.
+        :param record_path: Optional path of a landmark log to record to.
+        :return: The number of frames processed and the frames per second achieved.
+        """
+        frame_count = 0
+        start_time = time.perf_counter()
+        # Place each frame at its position in the video, not at processing time, so
+        # inference rates and recordings do not depend on how fast it is processed
+        frame_rate = source_fps(source)
+        recorder = LandmarkRecorder(record_path) if record_path else None
+
+        with open(output_path, "w") as output_file:
+            for frame in prefetch(iter_frames(source)):
+                # No overlay: nothing is drawn when processing offline
+                timestamp = frame_count / frame_rate
+                self.trackers_pipeline.process_frame(frame, timestamp=timestamp)
+
+                frame_results = {"frame": frame_count}
+                frame_results.update(self.trackers_pipeline.get_frame_results())
+                frame_results["gesture_events"] = (
+                    self.trackers_pipeline.take_gesture_events()
+                )
+                output_file.write(json.dumps(frame_results) + "\n")
+                if recorder is not None:
+                    recorder.record(self.trackers_pipeline, timestamp)
+                frame_count += 1
+        if recorder is not None:
+            recorder.close()
+
+        elapsed = time.perf_counter() - start_time
+        fps = frame_count / elapsed if elapsed > 0 else 0.0
+        return frame_count, fps
+
+    def stop(self):
+        self.trackers_pipeline.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Run the tracker pipelines over a video file or image directory."
+    )
+    parser.add_argument("source", help="Video file or directory of frames")
+    parser.add_argument("-o", "--output", required=True, help="Output JSON Lines file")
+    parser.add_argument(
+        "-c", "--config", default="config.json", help="Path to config.json"
+    )
+    parser.add_argument(
+        "--record", default=None, help="Also record the landmarks to this log"
+    )
+    args = parser.parse_args()
+
+    with open(args.config, "r") as config_file:
+        config = json.load(config_file)
+
+    processor = OfflineProcessor(config)
+    try:
+        frame_count, fps = processor.process(args.source, args.output, args.record)
+    finally:
+        processor.stop()
+    print(f"Processed {frame_count} frames at {fps:.1f} FPS. Results: {args.output}")
+    if processor.trackers_pipeline.motion_gate.enabled:
+        print(processor.trackers_pipeline.motion_gate.summary())
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,15 @@
-import cv2
 import mediapipe as mp
+from latency_monitor import latency_monitor
+from tracker_pipelines.landmark_renderer import RED_COLOR, LandmarkRenderer
+from tracker_pipelines.model_rebuilder import ModelRebuilder
+from tracker_pipelines.region_of_interest import (
+    FACE_POSE_LANDMARKS,
+    FACE_ROI_MARGIN,
+    HAND_POSE_LANDMARKS,
+    HAND_ROI_MARGIN,
+    RegionOfInterest,
+    RegionSmoother,
+)
 
 
 class BodyTrackerPipeline:
@@ -10,22 +20,41 @@ class BodyTrackerPipeline:
         min_tracking_confidence=0.3,
     ):
         self._model_complexity = model_complexity
+        self._model_complexity_cap = None  # Set by the quality governor
         self._min_detection_confidence = min_detection_confidence
         self._min_tracking_confidence = min_tracking_confidence
         self.mp_pose = mp.solutions.pose
         self.mp_drawing = mp.solutions.drawing_utils
-        self.initialize_pose()
+        self.landmark_renderer = LandmarkRenderer(
+            self.mp_pose.POSE_CONNECTIONS,
+            self.mp_drawing.DrawingSpec(color=RED_COLOR),
+            self.mp_drawing.DrawingSpec(),
+        )
+        self.results = None
+        self.pose = None  # Built on first use, see ensure_model
+
+        # Keep the face and hand regions steady between frames
+        self.region_smoothers = {"face": RegionSmoother(), "hand": RegionSmoother()}
+
+        # Parameter changes rebuild the model in the background
+        self.model_rebuilder = ModelRebuilder(
+            self.create_pose, lambda: self.pose is not None
+        )
 
     def initialize_pose(self):
-        self.pose = self.mp_pose.Pose(
+        self.pose = self.create_pose()
+
+    def create_pose(self):
+        return self.mp_pose.Pose(
             static_image_mode=False,
-            model_complexity=self._model_complexity,
+            model_complexity=self.effective_model_complexity(),
             min_detection_confidence=self._min_detection_confidence,
             min_tracking_confidence=self._min_tracking_confidence,
         )
 
     @property
     def model_complexity(self):
+        # The complexity the user asked for, before any quality cap
         return self._model_complexity
 
     @model_complexity.setter
@@ -35,8 +64,32 @@ class BodyTrackerPipeline:
             raise ValueError("model_complexity must be an integer.")
         if value < 0:
             raise ValueError("model_complexity must be at last 1.")
+        if value == self._model_complexity:
+            return
+        previous_complexity = self.effective_model_complexity()
         self._model_complexity = value
-        self.initialize_pose()
+        if self.effective_model_complexity() != previous_complexity:
+            self.model_rebuilder.request()
+
+    @property
+    def model_complexity_cap(self):
+        return self._model_complexity_cap
+
+    @model_complexity_cap.setter
+    def model_complexity_cap(self, value):
+        # The quality governor lowers the complexity without losing the user's choice
+        if value == self._model_complexity_cap:
+            return
+        previous_complexity = self.effective_model_complexity()
+        self._model_complexity_cap = value
+        if self.effective_model_complexity() != previous_complexity:
+            self.model_rebuilder.request()
+
+    def effective_model_complexity(self):
+        # The requested complexity, lowered to the quality cap if there is one
+        if self._model_complexity_cap is None:
+            return self._model_complexity
+        return min(self._model_complexity, self._model_complexity_cap)
 
     @property
     def min_detection_confidence(self):
@@ -49,8 +102,10 @@ class BodyTrackerPipeline:
             raise ValueError("min_detection_confidence must be a float")
         if value < 0.0:
             raise ValueError("min_detection_confidence must be >= 0.0")
+        if value == self._min_detection_confidence:
+            return
         self._min_detection_confidence = value
-        self.initialize_pose()
+        self.model_rebuilder.request()
 
     @property
     def min_tracking_confidence(self):
@@ -63,20 +118,102 @@ class BodyTrackerPipeline:
             raise ValueError("min_tracking_confidence must be a float")
         if value < 0.0:
             raise ValueError("min_tracking_confidence must be >= 0.0")
+        if value == self._min_tracking_confidence:
+            return
         self._min_tracking_confidence = value
-        self.initialize_pose()
+        self.model_rebuilder.request()
 
-    def process_frame(self, raw_frame, render_frame):
-        # Convert the frame to RGB and process it with Mediapipe
-        raw_frame_rgb = cv2.cvtColor(raw_frame, cv2.COLOR_BGR2RGB)
-        results = self.pose.process(raw_frame_rgb)
+    def swap_in_rebuilt_model(self):
+        # Replace the model between frames once a background rebuild has finished
+        rebuilt_model = self.model_rebuilder.take()
+        if rebuilt_model is not None:
+            previous_model = self.pose
+            self.pose = rebuilt_model
+            if previous_model is not None:
+                previous_model.close()
 
+    def ensure_model(self):
+        # Build the model the first time the pipeline actually processes a frame, so
+        # disabled pipelines never pay for loading one
+        if self.pose is None:
+            with latency_monitor.stage("body.initialize"):
+                self.initialize_pose()
+
+    def process(self, frame_context):
+        self.swap_in_rebuilt_model()
+        self.ensure_model()
+
+        # Process the shared RGB frame with Mediapipe
+        with latency_monitor.stage("body.inference"):
+            self.results = self.pose.process(frame_context.rgb_frame)
+        return self.results
+
+    def regions_of_interest(self, frame_width, frame_height):
+        """
+        Derives the regions the face and hand pipelines can process instead of the
+        full frame from the last processed pose.
+        :return: A dictionary of pipeline name to RegionOfInterest; pipelines whose
+                 body parts are not visible are left out and process the full frame.
+        """
+        if not self.results or not self.results.pose_landmarks:
+            for smoother in self.region_smoothers.values():
+                smoother.update(None)
+            return {}
+
+        regions = {
+            "face": RegionOfInterest.from_pose_landmarks(
+                self.results.pose_landmarks,
+                FACE_POSE_LANDMARKS,
+                frame_width,
+                frame_height,
+                FACE_ROI_MARGIN,
+            ),
+            "hand": RegionOfInterest.from_pose_landmarks(
+                self.results.pose_landmarks,
+                HAND_POSE_LANDMARKS,
+                frame_width,
+                frame_height,
+                HAND_ROI_MARGIN,
+            ),
+        }
+        regions = {
+            name: self.region_smoothers[name].update(region)
+            for name, region in regions.items()
+        }
+        return {name: region for name, region in regions.items() if region}
+
+    def draw(self, overlay):
         # Draw pose landmarks if detected
-        if results.pose_landmarks:
-            self.mp_drawing.draw_landmarks(
-                render_frame, results.pose_landmarks, self.mp_pose.POSE_CONNECTIONS
-            )
+        if self.results.pose_landmarks:
+            overlay.add(self.landmark_renderer.draw, self.results.pose_landmarks)
+
+    def process_frame(self, frame_context, overlay=None):
+        self.process(frame_context)
+        if overlay is not None:
+            self.draw(overlay)
+
+    def landmark_lists(self):
+        # Landmark lists of the last processed frame; the pose is a single list
+        if not self.results or not self.results.pose_landmarks:
+            return []
+        return [self.results.pose_landmarks]
+
+    def get_frame_results(self):
+        """
+        Returns the results of the last processed frame as plain Python data.
+        :return: The pose landmarks as [x, y, z, visibility] lists, or None.
+        """
+        if not self.results or not self.results.pose_landmarks:
+            return None
+
+        return [
+            [landmark.x, landmark.y, landmark.z, landmark.visibility]
+            for landmark in self.results.pose_landmarks.landmark
+        ]
 
     def stop(self):
-        # Release resources if needed
-        pass
+        # Stop background rebuilds and release the model
+        self.model_rebuilder.stop()
+        if self.pose is not None:
+            self.pose.close()
+            self.pose = None
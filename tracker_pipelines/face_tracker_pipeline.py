@@ -1,5 +1,8 @@
 import cv2
 import mediapipe as mp
+from latency_monitor import latency_monitor
+from tracker_pipelines.landmark_renderer import LandmarkRenderer
+from tracker_pipelines.model_rebuilder import ModelRebuilder
 from facial_expressions.smiling import is_smiling
 from facial_expressions.smiling import draw_debug_landmarks
 
@@ -13,10 +16,39 @@ class FaceTrackerPipeline:
         self._min_tracking_confidence = min_tracking_confidence
         self.mp_face_mesh = mp.solutions.face_mesh
         self.mp_drawing = mp.solutions.drawing_utils
-        self.initialize_face_mesh()
+        self.mesh_renderer = LandmarkRenderer(
+            self.mp_face_mesh.FACEMESH_TESSELATION,
+            self.mp_drawing.DrawingSpec(
+                color=(80, 110, 10), thickness=1, circle_radius=1
+            ),
+            self.mp_drawing.DrawingSpec(
+                color=(80, 256, 121), thickness=1, circle_radius=1
+            ),
+        )
+        self.contour_renderer = LandmarkRenderer(
+            self.mp_face_mesh.FACEMESH_CONTOURS,
+            None,
+            self.mp_drawing.DrawingSpec(
+                color=(80, 256, 121), thickness=1, circle_radius=1
+            ),
+        )
+        self.results = None
+        self.smiling_results = []
+        self.face_mesh = None  # Built on first use, see ensure_model
+
+        # Draw only the face contours instead of the full mesh, to save drawing time
+        self.cheap_drawing = False
+
+        # Parameter changes rebuild the model in the background
+        self.model_rebuilder = ModelRebuilder(
+            self.create_face_mesh, lambda: self.face_mesh is not None
+        )
 
     def initialize_face_mesh(self):
-        self.face_mesh = self.mp_face_mesh.FaceMesh(
+        self.face_mesh = self.create_face_mesh()
+
+    def create_face_mesh(self):
+        return self.mp_face_mesh.FaceMesh(
             static_image_mode=False,
             max_num_faces=self._max_num_faces,
             min_detection_confidence=self._min_detection_confidence,
@@ -34,8 +66,10 @@ class FaceTrackerPipeline:
             raise ValueError("max_num_faces must be an integer.")
         if value < 1:
             raise ValueError("max_num_faces must be at last 1.")
+        if value == self._max_num_faces:
+            return
         self._max_num_faces = value
-        self.initialize_face_mesh()
+        self.model_rebuilder.request()
 
     @property
     def min_detection_confidence(self):
@@ -48,8 +82,10 @@ class FaceTrackerPipeline:
             raise ValueError("min_detection_confidence must be a float")
         if value < 0.0:
             raise ValueError("min_detection_confidence must be >= 0.0")
+        if value == self._min_detection_confidence:
+            return
         self._min_detection_confidence = value
-        self.initialize_face_mesh()
+        self.model_rebuilder.request()
 
     @property
     def min_tracking_confidence(self):
@@ -62,35 +98,64 @@ class FaceTrackerPipeline:
             raise ValueError("min_tracking_confidence must be a float")
         if value < 0.0:
             raise ValueError("min_tracking_confidence must be >= 0.0")
+        if value == self._min_tracking_confidence:
+            return
         self._min_tracking_confidence = value
-        self.initialize_face_mesh()
+        self.model_rebuilder.request()
+
+    def swap_in_rebuilt_model(self):
+        # Replace the model between frames once a background rebuild has finished
+        rebuilt_model = self.model_rebuilder.take()
+        if rebuilt_model is not None:
+            previous_model = self.face_mesh
+            self.face_mesh = rebuilt_model
+            if previous_model is not None:
+                previous_model.close()
+
+    def ensure_model(self):
+        # Build the model the first time the pipeline actually processes a frame, so
+        # disabled pipelines never pay for loading one
+        if self.face_mesh is None:
+            with latency_monitor.stage("face.initialize"):
+                self.initialize_face_mesh()
 
-    def process_frame(self, raw_frame, render_frame):
-        # Conver the raw frame to RGB and process it with Mediapipe
-        raw_frame_rgb = cv2.cvtColor(raw_frame, cv2.COLOR_BGR2RGB)
-        results = self.face_mesh.process(raw_frame_rgb)
+    def process(self, frame_context):
+        self.swap_in_rebuilt_model()
+        self.ensure_model()
 
+        # Process the shared RGB frame, or the region the body pipeline found
+        image, region = frame_context.pipeline_input("face")
+        with latency_monitor.stage("face.inference"):
+            self.results = self.face_mesh.process(image)
+        if region is not None:
+            for landmarks in self.results.multi_face_landmarks or []:
+                region.to_frame(landmarks)
+
+        # Evaluate facial expressions for every detected face
+        with latency_monitor.stage("face.expressions"):
+            self.smiling_results = [
+                is_smiling(face_landmarks)
+                for face_landmarks in self.results.multi_face_landmarks or []
+            ]
+        return self.results
+
+    def draw(self, overlay):
         # Draw face landmarks on the render frame if detected
-        if results.multi_face_landmarks:
-            for face_landmarks in results.multi_face_landmarks:
-                self.mp_drawing.draw_landmarks(
-                    render_frame,
-                    face_landmarks,
-                    self.mp_face_mesh.FACEMESH_TESSELATION,
-                    self.mp_drawing.DrawingSpec(
-                        color=(80, 110, 10), thickness=1, circle_radius=1
-                    ),
-                    self.mp_drawing.DrawingSpec(
-                        color=(80, 256, 121), thickness=1, circle_radius=1
-                    ),
-                )
-
-                # Call the function to draw the debug landmarks (in smiling.py)
-                draw_debug_landmarks(render_frame, face_landmarks)
-
-                if is_smiling(face_landmarks):
-                    cv2.putText(
-                        render_frame,
+        if self.results.multi_face_landmarks:
+            for face_landmarks, smiling in zip(
+                self.results.multi_face_landmarks, self.smiling_results
+            ):
+                if self.cheap_drawing:
+                    overlay.add(self.contour_renderer.draw, face_landmarks)
+                else:
+                    overlay.add(self.mesh_renderer.draw, face_landmarks)
+
+                    # Call the function to draw the debug landmarks (in smiling.py)
+                    overlay.add(draw_debug_landmarks, face_landmarks)
+
+                if smiling:
+                    overlay.add(
+                        cv2.putText,
                         "Smiling!",
                         (30, 50),
                         cv2.FONT_HERSHEY_SIMPLEX,
@@ -100,6 +165,41 @@ class FaceTrackerPipeline:
                         cv2.LINE_AA,
                     )
 
+    def process_frame(self, frame_context, overlay=None):
+        self.process(frame_context)
+        if overlay is not None:
+            self.draw(overlay)
+
+    def landmark_lists(self):
+        # Landmark lists of the last processed frame, one per face
+        if not self.results or not self.results.multi_face_landmarks:
+            return []
+        return list(self.results.multi_face_landmarks)
+
+    def get_frame_results(self):
+        """
+        Returns the results of the last processed frame as plain Python data.
+        :return: A list with the landmarks and detected expressions of each face.
+        """
+        if not self.results or not self.results.multi_face_landmarks:
+            return []
+
+        return [
+            {
+                "landmarks": [
+                    [landmark.x, landmark.y, landmark.z]
+                    for landmark in face_landmarks.landmark
+                ],
+                "expressions": ["smiling"] if smiling else [],
+            }
+            for face_landmarks, smiling in zip(
+                self.results.multi_face_landmarks, self.smiling_results
+            )
+        ]
+
     def stop(self):
-        # Release resources if needed
-        pass
+        # Stop background rebuilds and release the model
+        self.model_rebuilder.stop()
+        if self.face_mesh is not None:
+            self.face_mesh.close()
+            self.face_mesh = None
@@ -0,0 +1,47 @@
+import cv2
+
+
+class FrameContext:
+    """
+    Data derived from a single camera frame that every tracker pipeline shares, so
+    each conversion is done once per frame no matter how many pipelines are enabled.
+    """
+
+    def __init__(self, raw_frame, read_only=True, inference_scale=1.0):
+        self.raw_frame = raw_frame
+
+        # Shrink the frame the pipelines see when trading accuracy for speed. The
+        # landmarks are normalized, so they need no mapping back.
+        if inference_scale != 1.0:
+            raw_frame = cv2.resize(
+                raw_frame,
+                None,
+                fx=inference_scale,
+                fy=inference_scale,
+                interpolation=cv2.INTER_AREA,
+            )
+
+        # Mediapipe expects RGB; convert once for all pipelines
+        self.rgb_frame = cv2.cvtColor(raw_frame, cv2.COLOR_BGR2RGB)
+        self.height, self.width = self.rgb_frame.shape[:2]
+
+        # Marking the buffer read-only lets Mediapipe use it without copying,
+        # and keeps a pipeline from modifying the frame the others will see
+        if read_only:
+            self.rgb_frame.flags.writeable = False
+
+        # Regions of interest found by earlier pipelines, keyed by the name of the
+        # pipeline that should process only that region
+        self.regions = {}
+
+    def pipeline_input(self, name):
+        """
+        Returns the image a pipeline should process: its region of interest if an
+        earlier pipeline provided one, otherwise the full RGB frame.
+        :param name: Name of the pipeline, e.g. "face".
+        :return: An (image, region) tuple; region is None for the full frame.
+        """
+        region = self.regions.get(name)
+        if region is None:
+            return self.rgb_frame, None
+        return region.crop(self.rgb_frame), region
@@ -1,9 +1,13 @@
+import collections
 import cv2
 import mediapipe as mp
-from gestures.thumbs_up import is_thumb_up
-from gestures.thumbs_down import is_thumb_down
-from gestures.thumbs_out import is_thumb_out
-from gestures.peace_sign import is_peace_sign
+from gestures.engine import create_default_gesture_engine
+from gestures.gesture_classifier import GestureClassifier
+from gestures.gesture_tracker import HOLD_FRAMES, GestureTracker, hand_keys
+from gestures.utils import HandFeatures
+from latency_monitor import latency_monitor
+from tracker_pipelines.landmark_renderer import RED_COLOR, LandmarkRenderer
+from tracker_pipelines.model_rebuilder import ModelRebuilder
 
 ### Define constants for clarity
 FONT = cv2.FONT_HERSHEY_SIMPLEX
@@ -23,19 +27,69 @@ THUMBS_DOWN_COLOR = (0, 0, 255)  # Red
 THUMBS_OUT_COLOR = (0, 255, 0)  # Green
 PEACE_SIGN_COLOR = (255, 0, 0)  # Blue
 
+# Text of gestures learned by a classifier, which have no GESTURE_TEXT entry: the
+# first one shown goes below the built-in gestures and the next ones below it
+LEARNED_GESTURE_TEXT_POS = (30, 150)
+LEARNED_GESTURE_LINE_SPACING = 50
+LEARNED_GESTURE_COLOR = (0, 255, 255)  # Yellow
+
+# Gesture events kept for take_gesture_events; older ones are dropped if nobody
+# takes them
+MAX_PENDING_GESTURE_EVENTS = 256
+
+# Text drawn for each detected gesture, keyed by gesture engine name.
+# Gestures without an entry are still evaluated but not drawn.
+GESTURE_TEXT = {
+    "thumbs_up": ("Thumb's Up!", THUMBS_UP_TEXT_POS, THUMBS_UP_COLOR),
+    "thumbs_down": ("Thumb's Down!", THUMBS_DOWN_TEXT_POS, THUMBS_DOWN_COLOR),
+    "peace_sign": ("Peace Sign!", PEACE_SIGN_TEXT_POS, PEACE_SIGN_COLOR),
+}
+
+
 class HandTrackerPipeline:
     def __init__(
-        self, max_num_hands=2, min_detection_confidence=0.7, min_tracking_confidence=0.7
+        self,
+        max_num_hands=2,
+        min_detection_confidence=0.7,
+        min_tracking_confidence=0.7,
+        gesture_hold_frames=HOLD_FRAMES,
+        gesture_classifier_path=None,
     ):
         self._max_num_hands = max_num_hands
         self._min_detection_confidence = min_detection_confidence
         self._min_tracking_confidence = min_tracking_confidence
         self.mp_hands = mp.solutions.hands
         self.mp_drawing = mp.solutions.drawing_utils
-        self.initialize_hands()
+        self.landmark_renderer = LandmarkRenderer(
+            self.mp_hands.HAND_CONNECTIONS,
+            self.mp_drawing.DrawingSpec(color=RED_COLOR),
+            self.mp_drawing.DrawingSpec(),
+        )
+        self.gesture_engine = create_default_gesture_engine()
+        self.learned_gestures = []
+        if gesture_classifier_path:
+            # Learned gestures are classified alongside the built-in ones
+            gesture_classifier = GestureClassifier.load(gesture_classifier_path)
+            self.gesture_engine.register_classifier(gesture_classifier)
+            self.learned_gestures = gesture_classifier.names
+        self.results = None
+        self.gesture_results = None
+
+        # Stable per-hand gesture states, and the start/end events not yet taken
+        self.gesture_tracker = GestureTracker(self.gesture_engine, gesture_hold_frames)
+        self.gesture_events = collections.deque(maxlen=MAX_PENDING_GESTURE_EVENTS)
+        self.hands = None  # Built on first use, see ensure_model
+
+        # Parameter changes rebuild the model in the background
+        self.model_rebuilder = ModelRebuilder(
+            self.create_hands, lambda: self.hands is not None
+        )
 
     def initialize_hands(self):
-        self.hands = self.mp_hands.Hands(
+        self.hands = self.create_hands()
+
+    def create_hands(self):
+        return self.mp_hands.Hands(
             static_image_mode=False,
             max_num_hands=self._max_num_hands,
             min_detection_confidence=self._min_detection_confidence,
@@ -53,8 +107,10 @@ class HandTrackerPipeline:
             raise ValueError("max_num_hands must be an integer.")
         if value < 1:
             raise ValueError("max_num_hands must be at last 1.")
+        if value == self._max_num_hands:
+            return
         self._max_num_hands = value
-        self.initialize_hands()
+        self.model_rebuilder.request()
 
     @property
     def min_detection_confidence(self):
@@ -67,8 +123,10 @@ class HandTrackerPipeline:
             raise ValueError("min_detection_confidence must be a float")
         if value < 0.0:
             raise ValueError("min_detection_confidence must be >= 0.0")
+        if value == self._min_detection_confidence:
+            return
         self._min_detection_confidence = value
-        self.initialize_hands()
+        self.model_rebuilder.request()
 
     @property
     def min_tracking_confidence(self):
@@ -81,61 +139,178 @@ class HandTrackerPipeline:
             raise ValueError("min_tracking_confidence must be a float")
         if value < 0.0:
             raise ValueError("min_tracking_confidence must be >= 0.0")
+        if value == self._min_tracking_confidence:
+            return
         self._min_tracking_confidence = value
-        self.initialize_hands()
+        self.model_rebuilder.request()
+
+    def swap_in_rebuilt_model(self):
+        # Replace the model between frames once a background rebuild has finished
+        rebuilt_model = self.model_rebuilder.take()
+        if rebuilt_model is not None:
+            previous_model = self.hands
+            self.hands = rebuilt_model
+            if previous_model is not None:
+                previous_model.close()
+
+    def ensure_model(self):
+        # Build the model the first time the pipeline actually processes a frame, so
+        # disabled pipelines never pay for loading one
+        if self.hands is None:
+            with latency_monitor.stage("hand.initialize"):
+                self.initialize_hands()
+
+    def process(self, frame_context):
+        self.swap_in_rebuilt_model()
+        self.ensure_model()
 
-    def process_frame(self, raw_frame, render_frame):
-        # Convert the frame to RGB and process it with Mediapipe
-        raw_frame_rgb = cv2.cvtColor(raw_frame, cv2.COLOR_BGR2RGB)
-        results = self.hands.process(raw_frame_rgb)
+        # Process the shared RGB frame, or the region the body pipeline found
+        image, region = frame_context.pipeline_input("hand")
+        with latency_monitor.stage("hand.inference"):
+            self.results = self.hands.process(image)
+        if region is not None:
+            for landmarks in self.results.multi_hand_landmarks or []:
+                region.to_frame(landmarks)
+
+        # Evaluate every registered gesture for all hands at once
+        if self.results.multi_hand_landmarks:
+            with latency_monitor.stage("hand.gestures"):
+                hand_features = HandFeatures.from_multi_hand_landmarks(
+                    self.results.multi_hand_landmarks
+                )
+                self.gesture_results = self.gesture_engine.evaluate(
+                    hand_features, self.handedness_labels()
+                )
+        else:
+            self.gesture_results = None
 
+        # Debounce the per-frame results into gesture start and end events
+        self.gesture_events.extend(
+            self.gesture_tracker.update(self.hand_keys(), self.gesture_results)
+        )
+        return self.results
+
+    def hold_gestures(self):
+        """
+        Advances the gesture states on a frame that skipped inference, with the
+        gestures of the held hands, so the hold frames of the gesture tracker count
+        displayed frames rather than inference runs.
+        """
+        if self.results is None:
+            return
+        self.gesture_events.extend(
+            self.gesture_tracker.update(self.hand_keys(), self.gesture_results)
+        )
+
+    def hand_keys(self):
+        # Identify each detected hand by its handedness, for the gesture tracker
+        if not self.results or not self.results.multi_hand_landmarks:
+            return []
+        return hand_keys(
+            len(self.results.multi_hand_landmarks), self.handedness_labels()
+        )
+
+    def handedness_labels(self):
+        # "Left" or "Right" label of each detected hand, or None if not reported
+        if not self.results or not self.results.multi_handedness:
+            return None
+        return [
+            classification.classification[0].label
+            for classification in self.results.multi_handedness
+        ]
+
+    def take_gesture_events(self):
+        """
+        Returns the gesture start and end events since the last call.
+        :return: A list of dictionaries with the hand, gesture and event.
+        """
+        events = list(self.gesture_events)
+        self.gesture_events.clear()
+        return events
+
+    def draw(self, overlay):
         # Draw hand landmarks if detected
-        if results.multi_hand_landmarks:
-            for hand_landmarks in results.multi_hand_landmarks:
-                self.mp_drawing.draw_landmarks(
-                    render_frame, hand_landmarks, self.mp_hands.HAND_CONNECTIONS
+        if self.results.multi_hand_landmarks:
+            for hand_landmarks in self.results.multi_hand_landmarks:
+                overlay.add(self.landmark_renderer.draw, hand_landmarks)
+
+        # Draw the gestures that held long enough to start, so they do not flicker
+        self.draw_gestures(overlay, self.gesture_tracker.active_results())
+
+    def process_frame(self, frame_context, overlay=None):
+        self.process(frame_context)
+        if overlay is not None:
+            self.draw(overlay)
+
+    def draw_gestures(self, overlay, gesture_results):
+        # Display the text of every gesture detected on any hand
+        detected = gesture_results.any(axis=0)
+        for name, (text, position, color) in GESTURE_TEXT.items():
+            if detected[self.gesture_engine.index(name)]:
+                overlay.add(
+                    cv2.putText,
+                    text,
+                    position,
+                    FONT,
+                    FONT_SCALE,
+                    color,
+                    FONT_THICKNESS,
+                    LINE_TYPE,
                 )
 
-                # Check for the "Thumb's Up" gesture
-                if is_thumb_up(hand_landmarks):
-                    # Display "Thumb's Up!" text on the frame
-                    cv2.putText(
-                        render_frame,
-                        "Thumb's Up!",
-                        THUMBS_UP_TEXT_POS,
-                        FONT,
-                        FONT_SCALE,
-                        THUMBS_UP_COLOR,
-                        FONT_THICKNESS,
-                        LINE_TYPE,
-                    )
-                # Check for the "Thumb's Down" gesture
-                elif is_thumb_down(hand_landmarks):
-                    # Display "Thumb's Down!" text on the frame
-                    cv2.putText(
-                        render_frame,
-                        "Thumb's Down!",
-                        THUMBS_DOWN_TEXT_POS,
-                        FONT,
-                        FONT_SCALE,
-                        THUMBS_DOWN_COLOR,
-                        FONT_THICKNESS,
-                        LINE_TYPE,
-                    )
-
-                # Check for the "Peace Sign" gesture
-                if is_peace_sign(hand_landmarks):
-                    cv2.putText(
-                        render_frame,
-                        "Peace Sign!",
-                        PEACE_SIGN_TEXT_POS,
-                        FONT,
-                        FONT_SCALE,
-                        PEACE_SIGN_COLOR,
-                        FONT_THICKNESS,
-                        LINE_TYPE,
-                    )
+        # Learned gestures are drawn with their name, one line each
+        x, y = LEARNED_GESTURE_TEXT_POS
+        for name in self.learned_gestures:
+            if name in GESTURE_TEXT or not detected[self.gesture_engine.index(name)]:
+                continue
+            overlay.add(
+                cv2.putText,
+                f"{name.replace('_', ' ').title()}!",
+                (x, y),
+                FONT,
+                FONT_SCALE,
+                LEARNED_GESTURE_COLOR,
+                FONT_THICKNESS,
+                LINE_TYPE,
+            )
+            y += LEARNED_GESTURE_LINE_SPACING
+
+    def landmark_lists(self):
+        # Landmark lists of the last processed frame, one per hand
+        if not self.results or not self.results.multi_hand_landmarks:
+            return []
+        return list(self.results.multi_hand_landmarks)
+
+    def get_frame_results(self):
+        """
+        Returns the results of the last processed frame as plain Python data.
+        :return: A list with the handedness, landmarks and started gestures of each hand.
+        """
+        if not self.results or not self.results.multi_hand_landmarks:
+            return []
+
+        hands = []
+        for i, (hand_landmarks, hand_key) in enumerate(
+            zip(self.results.multi_hand_landmarks, self.hand_keys())
+        ):
+            handedness = None
+            if self.results.multi_handedness:
+                handedness = self.results.multi_handedness[i].classification[0].label
+            hands.append(
+                {
+                    "handedness": handedness,
+                    "landmarks": [
+                        [landmark.x, landmark.y, landmark.z]
+                        for landmark in hand_landmarks.landmark
+                    ],
+                    "gestures": self.gesture_tracker.active_gestures(hand_key),
+                }
+            )
+        return hands
 
     def stop(self):
-        # Release resources if needed
-        pass
+        # Stop background rebuilds and release the model
+        self.model_rebuilder.stop()
+        if self.hands is not None:
+            self.hands.close()
+            self.hands = None
@@ -0,0 +1,126 @@
+import numpy as np
+
+# A frame arriving up to this fraction of an interval early still counts as on time,
+# so camera jitter does not make a pipeline skip frames it was meant to process
+SCHEDULE_TOLERANCE = 0.1
+
+# How landmarks of frames skipped by the scheduler are produced
+SKIPPED_FRAME_MODES = ("hold", "extrapolate")
+
+
+class InferenceScheduler:
+    """
+    Decides on which frames each pipeline runs inference to meet its target rate.
+
+    Runs are scheduled on a fixed grid of intervals rather than relative to the
+    previous run, so the average rate stays on target when frames arrive unevenly.
+    Pipelines without a rate run on every frame.
+    """
+
+    def __init__(self, rates=None):
+        """
+        :param rates: Dictionary of pipeline name to target rate in Hz. Missing
+                      pipelines, and rates of 0 or None, run on every frame.
+        """
+        self._next_run_time = {}  # Pipeline name -> time the next run is due
+        self.set_rates(rates)
+
+    def set_rates(self, rates):
+        """
+        Changes the target rates, keeping each pipeline's schedule.
+        :param rates: Dictionary of pipeline name to target rate in Hz, as in __init__.
+        """
+        self._intervals = {
+            name: 1.0 / rate for name, rate in (rates or {}).items() if rate
+        }
+
+    def is_due(self, name, now):
+        """
+        Checks if a pipeline is due for inference, without changing its schedule.
+        :param name: Name of the pipeline.
+        :param now: Current time from time.perf_counter.
+        """
+        interval = self._intervals.get(name)
+        if interval is None:
+            return True
+
+        next_run_time = self._next_run_time.get(name)
+        return (
+            next_run_time is None
+            or now >= next_run_time - interval * SCHEDULE_TOLERANCE
+        )
+
+    def mark_run(self, name, now):
+        """
+        Schedules the next run of a pipeline that ran inference.
+        :param name: Name of the pipeline.
+        :param now: Current time from time.perf_counter.
+        """
+        interval = self._intervals.get(name)
+        if interval is None:
+            return
+
+        # Fall back onto the grid instead of bursting if the pipeline fell behind,
+        # e.g. after being disabled or gated for a while
+        next_run_time = self._next_run_time.get(name)
+        if next_run_time is None or next_run_time + interval < now:
+            next_run_time = now
+        self._next_run_time[name] = next_run_time + interval
+
+
+class LandmarkExtrapolator:
+    """
+    Predicts the landmarks of frames a pipeline skipped from the velocity between
+    its last two inferences, writing them into the held results in place.
+    """
+
+    def __init__(self):
+        self._positions = None  # Landmarks of the last inference, (lists, points, 3)
+        self._velocity = None  # Per-second change since the inference before it
+        self._time = None
+        self._interval = None  # Time between the last two inferences
+
+    def update(self, landmark_lists, now):
+        """
+        Records the landmarks of a frame the pipeline ran inference on.
+        :param landmark_lists: The pipeline's Mediapipe landmark lists.
+        :param now: Time of the frame from time.perf_counter.
+        """
+        positions = np.array(
+            [
+                [[landmark.x, landmark.y, landmark.z] for landmark in lst.landmark]
+                for lst in landmark_lists
+            ],
+            dtype=np.float32,
+        )
+
+        # Only the same set of tracked objects has a meaningful velocity
+        if (
+            self._positions is not None
+            and positions.shape == self._positions.shape
+            and now > self._time
+        ):
+            self._interval = now - self._time
+            self._velocity = (positions - self._positions) / self._interval
+        else:
+            self._velocity = None
+        self._positions = positions
+        self._time = now
+
+    def predict(self, landmark_lists, now):
+        """
+        Moves the held landmarks to where they are expected to be at the given time.
+        Predictions never reach further ahead than one inference interval.
+        :param landmark_lists: The held landmark lists recorded by the last update.
+        :param now: Time of the skipped frame from time.perf_counter.
+        """
+        if self._velocity is None or len(landmark_lists) != len(self._positions):
+            return
+
+        elapsed = min(now - self._time, self._interval)
+        predicted = self._positions + self._velocity * elapsed
+        for lst, points in zip(landmark_lists, predicted):
+            for landmark, (x, y, z) in zip(lst.landmark, points.tolist()):
+                landmark.x = x
+                landmark.y = y
+                landmark.z = z
@@ -0,0 +1,101 @@
+import cv2
+import numpy as np
+
+# Colors and thresholds used by mediapipe.solutions.drawing_utils, so the output
+# looks the same
+WHITE_COLOR = (224, 224, 224)
+RED_COLOR = (0, 0, 255)
+VISIBILITY_THRESHOLD = 0.5
+PRESENCE_THRESHOLD = 0.5
+
+# Normalized coordinates this far past 1.0 still count as inside the image
+NORMALIZED_TOLERANCE = 1e-9
+
+
+class LandmarkRenderer:
+    """
+    Draws Mediapipe landmark lists like mp_drawing.draw_landmarks, but converts all
+    landmarks to pixels in one NumPy operation and draws all connections with a
+    single cv2.polylines call.
+
+    The connection topology is turned into an index array once, when the renderer
+    is created, instead of being walked in Python on every frame.
+    """
+
+    def __init__(self, connections, landmark_drawing_spec, connection_drawing_spec):
+        """
+        :param connections: Pairs of landmark indices, e.g. mp_hands.HAND_CONNECTIONS.
+        :param landmark_drawing_spec: DrawingSpec of the landmark circles, or None to
+                                      draw no circles.
+        :param connection_drawing_spec: DrawingSpec of the connection lines.
+        """
+        self.connections = np.array(sorted(connections), dtype=np.int64).reshape(-1, 2)
+        self.landmark_drawing_spec = landmark_drawing_spec
+        self.connection_drawing_spec = connection_drawing_spec
+
+    def to_pixels(self, landmark_list, image_width, image_height):
+        """
+        Converts landmarks to pixel coordinates.
+        :return: An (L, 2) int32 array of pixel coordinates and an (L,) boolean array
+                 of the landmarks that are visible and inside the image.
+        """
+        landmarks = landmark_list.landmark
+        coordinates = np.array(
+            [(landmark.x, landmark.y) for landmark in landmarks], dtype=np.float64
+        ).reshape(-1, 2)
+        valid = np.all(
+            (coordinates >= 0.0) & (coordinates <= 1.0 + NORMALIZED_TOLERANCE), axis=1
+        )
+
+        # Pose landmarks carry a visibility and presence; hand and face ones do not
+        if len(landmarks) and landmarks[0].HasField("visibility"):
+            valid &= (
+                np.array([landmark.visibility for landmark in landmarks])
+                >= VISIBILITY_THRESHOLD
+            )
+        if len(landmarks) and landmarks[0].HasField("presence"):
+            valid &= (
+                np.array([landmark.presence for landmark in landmarks])
+                >= PRESENCE_THRESHOLD
+            )
+
+        pixels = np.floor(coordinates * (image_width, image_height)).astype(np.int32)
+        np.minimum(pixels, (image_width - 1, image_height - 1), out=pixels)
+        return pixels, valid
+
+    def draw(self, image, landmark_list):
+        """
+        Draws the landmarks and their connections onto the image.
+        :param image: The BGR image to draw on.
+        :param landmark_list: A Mediapipe NormalizedLandmarkList.
+        """
+        if not landmark_list:
+            return
+        image_height, image_width = image.shape[:2]
+        pixels, valid = self.to_pixels(landmark_list, image_width, image_height)
+
+        # Draw every connection whose two landmarks are drawn, in one call
+        if self.connection_drawing_spec is not None and len(self.connections):
+            connections = self.connections[
+                np.all(self.connections < len(pixels), axis=1)
+            ]
+            connections = connections[valid[connections].all(axis=1)]
+            if len(connections):
+                cv2.polylines(
+                    image,
+                    pixels[connections],
+                    False,
+                    self.connection_drawing_spec.color,
+                    self.connection_drawing_spec.thickness,
+                )
+
+        # Circles have no batched call; draw a white border then the fill for each
+        # landmark in turn, since neighbouring circles overlap
+        spec = self.landmark_drawing_spec
+        if spec is not None:
+            border_radius = max(spec.circle_radius + 1, int(spec.circle_radius * 1.2))
+            for center in map(tuple, pixels[valid].tolist()):
+                cv2.circle(image, center, border_radius, WHITE_COLOR, spec.thickness)
+                cv2.circle(
+                    image, center, spec.circle_radius, spec.color, spec.thickness
+                )
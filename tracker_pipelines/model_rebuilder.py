@@ -0,0 +1,91 @@
+import threading
+import time
+import traceback
+
+# Time to wait after the last parameter change before rebuilding the model
+DEBOUNCE_SECONDS = 0.3
+
+
+class ModelRebuilder:
+    """
+    Rebuilds a pipeline's Mediapipe model on a background thread when its parameters
+    change, so the UI thread never blocks on graph construction.
+
+    Changes are debounced: dragging a slider produces one rebuild once it settles.
+    The finished model is held until the pipeline takes it between two frames, so
+    the model in use is never replaced while it is processing a frame. While the
+    pipeline has no model, because it was never used or was stopped, requests are
+    ignored: the model built on first use already has the current parameters.
+    """
+
+    def __init__(self, build_model, has_model, debounce_seconds=DEBOUNCE_SECONDS):
+        self._build_model = build_model
+        self._has_model = has_model
+        self._debounce_seconds = debounce_seconds
+        self._condition = threading.Condition()
+        self._deadline = None  # Time at which the pending rebuild should start
+        self._ready_model = None  # Rebuilt model waiting to be swapped in
+        self._stop_signal = False
+        self._thread = threading.Thread(target=self._rebuild_loop, daemon=True)
+        self._thread.start()
+
+    def request(self):
+        """Schedules a rebuild, postponing any rebuild that has not started yet."""
+        if not self._has_model():
+            return
+        with self._condition:
+            self._deadline = time.monotonic() + self._debounce_seconds
+            self._condition.notify()
+
+    def _rebuild_loop(self):
+        while True:
+            with self._condition:
+                while not self._stop_signal and (
+                    self._deadline is None or time.monotonic() < self._deadline
+                ):
+                    timeout = (
+                        None
+                        if self._deadline is None
+                        else self._deadline - time.monotonic()
+                    )
+                    self._condition.wait(timeout)
+                if self._stop_signal:
+                    return
+                self._deadline = None
+
+            # Build outside the lock so new requests can still be queued. A failed
+            # build keeps the current model and leaves the loop ready for the next
+            # request.
+            try:
+                model = self._build_model()
+            except Exception:
+                print("Failed to rebuild the model; keeping the current one.")
+                traceback.print_exc()
+                continue
+
+            with self._condition:
+                stale_model = self._ready_model
+                self._ready_model = model
+            if stale_model is not None:
+                stale_model.close()
+
+    def take(self):
+        """
+        Returns the rebuilt model if one is ready, handing over ownership of it.
+        :return: The new model, or None if no rebuild has finished.
+        """
+        with self._condition:
+            model = self._ready_model
+            self._ready_model = None
+            return model
+
+    def stop(self):
+        """Stops the rebuild thread and releases a model that was never taken."""
+        with self._condition:
+            self._stop_signal = True
+            self._condition.notify()
+        self._thread.join()
+
+        model = self.take()
+        if model is not None:
+            model.close()
@@ -0,0 +1,95 @@
+import cv2
+
+# Size of the grayscale thumbnail frames are compared at
+THUMBNAIL_SIZE = (64, 48)
+
+# A gated pipeline still runs after this many skipped frames, so slow changes the
+# thresholds miss cannot leave its results stale forever
+MAX_SKIPPED_FRAMES = 30
+
+
+class MotionGate:
+    """
+    Cheap change detector that lets pipelines skip inference on static scenes.
+
+    Every frame is shrunk to a small grayscale thumbnail. A pipeline only runs when
+    the mean absolute difference between the thumbnail and the one from the last
+    frame it ran on exceeds its threshold, in gray levels from 0 to 255. Comparing
+    against the pipeline's own last frame, rather than the previous frame, keeps
+    slow drifts from slipping under the threshold.
+    """
+
+    def __init__(self, thresholds=None, max_skipped_frames=MAX_SKIPPED_FRAMES):
+        """
+        :param thresholds: Dictionary of pipeline name to threshold. Missing
+                           pipelines, and thresholds of 0 or None, are never gated.
+        :param max_skipped_frames: Frames a pipeline may skip in a row.
+        """
+        self.thresholds = {
+            name: threshold
+            for name, threshold in (thresholds or {}).items()
+            if threshold
+        }
+        self.max_skipped_frames = max_skipped_frames
+        self._thumbnail = None
+        self._references = {}  # Pipeline name -> thumbnail of its last run
+        self._skipped_in_row = {}
+        self.checked_frames = {name: 0 for name in self.thresholds}
+        self.skipped_frames = {name: 0 for name in self.thresholds}
+
+    @property
+    def enabled(self):
+        return bool(self.thresholds)
+
+    def update(self, raw_frame):
+        """
+        Computes the thumbnail of a new frame. Call once per frame before should_run.
+        :param raw_frame: The BGR camera frame.
+        """
+        if not self.enabled:
+            return
+        thumbnail = cv2.resize(raw_frame, THUMBNAIL_SIZE, interpolation=cv2.INTER_AREA)
+        self._thumbnail = cv2.cvtColor(thumbnail, cv2.COLOR_BGR2GRAY)
+
+    def should_run(self, name):
+        """
+        Checks if the scene changed enough since the pipeline last ran, and if so
+        makes the current frame its new reference.
+        :param name: Name of the pipeline.
+        """
+        threshold = self.thresholds.get(name)
+        if threshold is None:
+            return True
+
+        self.checked_frames[name] += 1
+        reference = self._references.get(name)
+        skipped_in_row = self._skipped_in_row.get(name, 0)
+        if (
+            reference is not None
+            and skipped_in_row < self.max_skipped_frames
+            and cv2.absdiff(self._thumbnail, reference).mean() <= threshold
+        ):
+            self.skipped_frames[name] += 1
+            self._skipped_in_row[name] = skipped_in_row + 1
+            return False
+
+        self._references[name] = self._thumbnail
+        self._skipped_in_row[name] = 0
+        return True
+
+    def gating_ratios(self):
+        """
+        Returns the fraction of frames each gated pipeline skipped.
+        :return: A dictionary of pipeline name to ratio between 0 and 1.
+        """
+        return {
+            name: self.skipped_frames[name] / checked if checked else 0.0
+            for name, checked in self.checked_frames.items()
+        }
+
+    def summary(self):
+        """Returns a one-line description of the gating ratio of every pipeline."""
+        ratios = ", ".join(
+            f"{name} {ratio:.0%}" for name, ratio in self.gating_ratios().items()
+        )
+        return f"Motion gate skipped inference on {ratios} of frames."
@@ -0,0 +1,35 @@
+class Overlay:
+    """
+    Records the draw commands of every pipeline for a frame so they can be applied
+    to the frame once, after all pipelines have finished, instead of drawing onto a
+    separate copy of every frame.
+
+    A command is any function whose first argument is the image to draw on, such as
+    cv2.putText, cv2.circle or mp_drawing.draw_landmarks.
+    """
+
+    def __init__(self):
+        self._commands = []
+
+    def add(self, draw_function, *args, **kwargs):
+        """
+        Records a draw command.
+        :param draw_function: Function called as draw_function(image, *args, **kwargs).
+        """
+        self._commands.append((draw_function, args, kwargs))
+
+    def render(self, image):
+        """
+        Applies every recorded command to the image, in the order they were added.
+        :param image: The frame to draw on, modified in place.
+        :return: The same image.
+        """
+        for draw_function, args, kwargs in self._commands:
+            draw_function(image, *args, **kwargs)
+        return image
+
+    def clear(self):
+        self._commands.clear()
+
+    def __len__(self):
+        return len(self._commands)
@@ -0,0 +1,148 @@
+import collections
+
+# Quality levels from best to cheapest. Each level keeps the savings of the levels
+# above it and adds one more.
+QUALITY_LADDER = [
+    (
+        "full quality",
+        {
+            "inference_scale": 1.0,
+            "body_model_complexity": None,
+            "cheap_face_drawing": False,
+            "reduced_rates": False,
+        },
+    ),
+    (
+        "inference at 75% resolution",
+        {
+            "inference_scale": 0.75,
+            "body_model_complexity": None,
+            "cheap_face_drawing": False,
+            "reduced_rates": False,
+        },
+    ),
+    (
+        "inference at 50% resolution",
+        {
+            "inference_scale": 0.5,
+            "body_model_complexity": None,
+            "cheap_face_drawing": False,
+            "reduced_rates": False,
+        },
+    ),
+    (
+        "lightest body model",
+        {
+            "inference_scale": 0.5,
+            "body_model_complexity": 0,
+            "cheap_face_drawing": False,
+            "reduced_rates": False,
+        },
+    ),
+    (
+        "face contours only",
+        {
+            "inference_scale": 0.5,
+            "body_model_complexity": 0,
+            "cheap_face_drawing": True,
+            "reduced_rates": False,
+        },
+    ),
+    (
+        "reduced pipeline rates",
+        {
+            "inference_scale": 0.5,
+            "body_model_complexity": 0,
+            "cheap_face_drawing": True,
+            "reduced_rates": True,
+        },
+    ),
+]
+
+# Target time for processing one frame, matching a 30 FPS camera
+FRAME_BUDGET_MS = 33.0
+
+# Quality is raised again once frames take less than this fraction of the budget
+HEADROOM_RATIO = 0.7
+
+# Number of frames averaged for each decision. Windows do not overlap, so a new
+# level is judged on its own frames only.
+WINDOW_SIZE = 30
+
+# Limit of the back-off on raising quality, in windows; see QualityGovernor.record
+MAX_STEP_UP_WINDOWS = 32
+
+# Pipeline rates in Hz used on the reduced rates level, favouring hand gestures
+REDUCED_RATES = {"hand": 15, "body": 10, "face": 5}
+
+
+class QualityGovernor:
+    """
+    Watches the time spent processing each frame and steps down QUALITY_LADDER
+    while the average is over budget, and back up while there is headroom.
+
+    A step up that is immediately undone doubles the number of windows with
+    headroom needed before the next step up.
+    """
+
+    def __init__(
+        self,
+        frame_budget_ms=FRAME_BUDGET_MS,
+        headroom_ratio=HEADROOM_RATIO,
+        window_size=WINDOW_SIZE,
+    ):
+        self.frame_budget = frame_budget_ms / 1000.0
+        self.headroom_ratio = headroom_ratio
+        self.level = 0
+        self._frame_times = collections.deque(maxlen=window_size)
+        self._last_step = 0
+        self._step_up_windows = 1  # Windows with headroom needed to step up
+        self._headroom_windows = 0
+
+    @property
+    def settings(self):
+        """Settings of the current quality level."""
+        return QUALITY_LADDER[self.level][1]
+
+    def record(self, frame_seconds):
+        """
+        Records the processing time of a frame and steps the quality level if a full
+        window of frames is over budget or has headroom.
+        :param frame_seconds: Time spent processing the frame.
+        :return: The settings of the new level if it changed, otherwise None.
+        """
+        self._frame_times.append(frame_seconds)
+        if len(self._frame_times) < self._frame_times.maxlen:
+            return None
+
+        average = sum(self._frame_times) / len(self._frame_times)
+        self._frame_times.clear()
+        if average > self.frame_budget and self.level < len(QUALITY_LADDER) - 1:
+            step = 1
+            # Raising quality just went over budget again; wait longer next time so
+            # the level does not flip back and forth
+            if self._last_step < 0:
+                self._step_up_windows = min(
+                    self._step_up_windows * 2, MAX_STEP_UP_WINDOWS
+                )
+        elif average < self.frame_budget * self.headroom_ratio and self.level > 0:
+            self._headroom_windows += 1
+            if self._headroom_windows < self._step_up_windows:
+                return None
+            step = -1
+            if self._last_step < 0:
+                self._step_up_windows = 1
+        else:
+            self._headroom_windows = 0
+            return None
+
+        self.level += step
+        self._last_step = step
+        self._headroom_windows = 0
+        print(
+            f"Frame time {average * 1000.0:.1f} ms against a "
+            f"{self.frame_budget * 1000.0:.1f} ms budget; stepping "
+            f"{'down' if step > 0 else 'up'} to quality level {self.level} "
+            f"({QUALITY_LADDER[self.level][0]})."
+        )
+        return self.settings
@@ -0,0 +1,224 @@
+import numpy as np
+
+# Pose landmarks outlining the head: nose, eyes, ears and mouth
+FACE_POSE_LANDMARKS = [list(range(0, 11))]
+
+# Pose landmarks of each hand: wrist, pinky, index and thumb knuckles
+HAND_POSE_LANDMARKS = [[15, 17, 19, 21], [16, 18, 20, 22]]
+
+# Margin added on every side of a landmark group, as a fraction of its larger side.
+# The pose only sees the ears and mouth of a face and the knuckles of a hand, so the
+# margins make room for the forehead, chin and fingers.
+FACE_ROI_MARGIN = 0.5
+HAND_ROI_MARGIN = 1.0
+
+# Smallest side of a region in pixels, so distant faces and hands keep some context
+MIN_ROI_SIZE = 96
+
+# Pose landmarks less visible than this are ignored
+MIN_ROI_VISIBILITY = 0.5
+
+# A region is kept as is while the new one fits inside it and is at least this
+# fraction of its area, so small movements do not shift the crop the tracking
+# models see
+ROI_HOLD_AREA_RATIO = 0.5
+
+# Fraction of the way a region moves towards the new one when it has to change
+ROI_SMOOTHING = 0.5
+
+# Slack added on every side of a region when it changes, as a fraction of its
+# size, so the body part can move a little before the region has to follow
+ROI_HOLD_SLACK = 0.1
+
+
+class RegionOfInterest:
+    """
+    An area of the frame that a pipeline processes instead of the full frame.
+
+    Landmarks detected in the crop are normalized to the crop; to_frame maps them
+    back to normalized full-frame coordinates, so drawing and gesture code does not
+    need to know a crop was used.
+    """
+
+    __slots__ = ("x0", "y0", "x1", "y1", "frame_width", "frame_height")
+
+    def __init__(self, x0, y0, x1, y1, frame_width, frame_height):
+        self.x0 = x0
+        self.y0 = y0
+        self.x1 = x1
+        self.y1 = y1
+        self.frame_width = frame_width
+        self.frame_height = frame_height
+
+    @classmethod
+    def from_pose_landmarks(
+        cls,
+        pose_landmarks,
+        landmark_groups,
+        frame_width,
+        frame_height,
+        margin,
+        min_visibility=MIN_ROI_VISIBILITY,
+    ):
+        """
+        Builds the region covering groups of pose landmarks, e.g. both hands.
+        Each group is padded by its own size before the groups are combined.
+        :param pose_landmarks: The pose_landmarks of a Mediapipe Pose result.
+        :param landmark_groups: Lists of pose landmark indices.
+        :param frame_width: Width of the full frame in pixels.
+        :param frame_height: Height of the full frame in pixels.
+        :param margin: Padding on every side as a fraction of a group's larger side.
+        :param min_visibility: Landmarks below this visibility are ignored.
+        :return: A RegionOfInterest, or None if a group has no landmark visible
+                 enough, since the body part it tracks could be anywhere in the frame.
+        """
+        boxes = []
+        for indices in landmark_groups:
+            points = np.array(
+                [
+                    (landmark.x * frame_width, landmark.y * frame_height)
+                    for landmark in (pose_landmarks.landmark[i] for i in indices)
+                    if landmark.visibility >= min_visibility
+                ]
+            )
+            if len(points) == 0:
+                return None
+
+            # Pad the group into a square around its center
+            low, high = points.min(axis=0), points.max(axis=0)
+            center = (low + high) / 2.0
+            half_size = max((high - low).max() * (0.5 + margin), MIN_ROI_SIZE / 2.0)
+            boxes.append((center - half_size, center + half_size))
+
+        if not boxes:
+            return None
+
+        low = np.min([box[0] for box in boxes], axis=0)
+        high = np.max([box[1] for box in boxes], axis=0)
+        x0, y0 = np.clip(np.floor(low), 0, None).astype(int)
+        x1 = int(min(np.ceil(high[0]), frame_width))
+        y1 = int(min(np.ceil(high[1]), frame_height))
+        if x1 - x0 < 2 or y1 - y0 < 2:
+            return None
+        return cls(int(x0), int(y0), x1, y1, frame_width, frame_height)
+
+    def padded(self, fraction):
+        """
+        Returns the region grown by a fraction of its size on every side, within the
+        frame.
+        """
+        pad_x = int(round(self.width * fraction))
+        pad_y = int(round(self.height * fraction))
+        return RegionOfInterest(
+            max(self.x0 - pad_x, 0),
+            max(self.y0 - pad_y, 0),
+            min(self.x1 + pad_x, self.frame_width),
+            min(self.y1 + pad_y, self.frame_height),
+            self.frame_width,
+            self.frame_height,
+        )
+
+    def contains(self, other):
+        """Checks if another region lies entirely inside this one."""
+        return (
+            self.x0 <= other.x0
+            and self.y0 <= other.y0
+            and self.x1 >= other.x1
+            and self.y1 >= other.y1
+        )
+
+    @property
+    def width(self):
+        return self.x1 - self.x0
+
+    @property
+    def height(self):
+        return self.y1 - self.y0
+
+    def crop(self, image):
+        """
+        Returns the region of the image as a contiguous array, as Mediapipe requires.
+        :param image: The full frame.
+        """
+        return np.ascontiguousarray(image[self.y0 : self.y1, self.x0 : self.x1])
+
+    def to_frame(self, landmark_list):
+        """
+        Maps landmarks normalized to the crop to normalized full-frame coordinates,
+        in place.
+        :param landmark_list: A Mediapipe NormalizedLandmarkList detected in the crop.
+        """
+        scale_x = self.width / self.frame_width
+        scale_y = self.height / self.frame_height
+        offset_x = self.x0 / self.frame_width
+        offset_y = self.y0 / self.frame_height
+        for landmark in landmark_list.landmark:
+            landmark.x = landmark.x * scale_x + offset_x
+            landmark.y = landmark.y * scale_y + offset_y
+            # Depth uses roughly the same scale as x
+            landmark.z = landmark.z * scale_x
+
+
+class RegionSmoother:
+    """
+    Stabilizes the region a pipeline processes from frame to frame.
+
+    Mediapipe's hand and face models track landmarks from the previous frame, which
+    only works while the crop they see stays put. The region is therefore held while
+    the new one still fits inside it, and otherwise eased towards the new one, with
+    some slack, while always covering it.
+    """
+
+    def __init__(
+        self,
+        hold_area_ratio=ROI_HOLD_AREA_RATIO,
+        smoothing=ROI_SMOOTHING,
+        slack=ROI_HOLD_SLACK,
+    ):
+        self.hold_area_ratio = hold_area_ratio
+        self.smoothing = smoothing
+        self.slack = slack
+        self.region = None
+
+    def update(self, region):
+        """
+        Advances the smoothed region by one frame.
+        :param region: The RegionOfInterest derived from the current pose, or None to
+                       fall back to the full frame.
+        :return: The RegionOfInterest to process, or None for the full frame.
+        """
+        previous = self.region
+        if (
+            region is None
+            or previous is None
+            or (previous.frame_width, previous.frame_height)
+            != (region.frame_width, region.frame_height)
+        ):
+            self.region = region.padded(self.slack) if region is not None else None
+            return self.region
+
+        # Hold the region while the body part stays inside it
+        if previous.contains(region) and (
+            region.width * region.height
+            >= previous.width * previous.height * self.hold_area_ratio
+        ):
+            return previous
+
+        # Ease towards the new region, growing to cover it where easing falls short
+        target = region.padded(self.slack)
+        eased = [
+            round(old + (new - old) * self.smoothing)
+            for old, new in zip(
+                (previous.x0, previous.y0, previous.x1, previous.y1),
+                (target.x0, target.y0, target.x1, target.y1),
+            )
+        ]
+        self.region = RegionOfInterest(
+            min(eased[0], region.x0),
+            min(eased[1], region.y0),
+            max(eased[2], region.x1),
+            max(eased[3], region.y1),
+            region.frame_width,
+            region.frame_height,
+        )
+        return self.region
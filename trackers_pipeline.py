@@ -1,41 +1,37 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from latency_monitor import latency_monitor
 from tracker_pipelines.hand_tracker_pipeline import HandTrackerPipeline
 from tracker_pipelines.body_tracker_pipeline import BodyTrackerPipeline
 from tracker_pipelines.face_tracker_pipeline import FaceTrackerPipeline
+from tracker_pipelines.frame_context import FrameContext
+from tracker_pipelines.motion_gate import MAX_SKIPPED_FRAMES, MotionGate
+from tracker_pipelines.quality_governor import REDUCED_RATES, QualityGovernor
+from tracker_pipelines.inference_scheduler import (
+    SKIPPED_FRAME_MODES,
+    InferenceScheduler,
+    LandmarkExtrapolator,
+)
+
+# Pipeline class and config section of each pipeline, in the fixed order they are
+# drawn onto the render frame
+PIPELINE_CLASSES = {
+    "hand": (HandTrackerPipeline, "hand_tracker_pipeline"),
+    "body": (BodyTrackerPipeline, "body_tracker_pipeline"),
+    "face": (FaceTrackerPipeline, "face_tracker_pipeline"),
+}
 
 
 class TrackersPipeline:
 
     def __init__(self, config):
-        # Initialize hand tracker pipeline with config values
-        self.hand_tracking_pipeline = HandTrackerPipeline(
-            max_num_hands=config["hand_tracker_pipeline"]["max_num_hands"],
-            min_detection_confidence=config["hand_tracker_pipeline"][
-                "min_detection_confidence"
-            ],
-            min_tracking_confidence=config["hand_tracker_pipeline"][
-                "min_tracking_confidence"
-            ],
-        )
-
-        # Initialize body tracker pipeline with config values
-        self.body_tracking_pipeline = BodyTrackerPipeline(
-            min_detection_confidence=config["body_tracker_pipeline"][
-                "min_detection_confidence"
-            ],
-            min_tracking_confidence=config["body_tracker_pipeline"][
-                "min_tracking_confidence"
-            ],
-        )
+        self._config = config
 
-        # Initialize face tracker pipeline with config values
-        self.face_tracking_pipeline = FaceTrackerPipeline(
-            min_detection_confidence=config["face_tracker_pipeline"][
-                "min_detection_confidence"
-            ],
-            min_tracking_confidence=config["face_tracker_pipeline"][
-                "min_tracking_confidence"
-            ],
-        )
+        # Pipelines are created the first time they are used, so disabled pipelines
+        # cost nothing at startup
+        self.pipelines = {}
+        self._pipelines_lock = threading.Lock()
 
         # Initialize pipeline states based on config file
         self.pipeline_states = {
@@ -44,14 +40,279 @@ class TrackersPipeline:
             "face": config["tracker_pipelines"]["face"],
         }
 
-    def process_frame(self, raw_frame, render_frame):
-        # Process the frame with each pipeline based on the state
-        if self.pipeline_states["hand"]:
-            self.hand_tracking_pipeline.process_frame(raw_frame, render_frame)
-        if self.pipeline_states["body"]:
-            self.body_tracking_pipeline.process_frame(raw_frame, render_frame)
-        if self.pipeline_states["face"]:
-            self.face_tracking_pipeline.process_frame(raw_frame, render_frame)
+        trackers_pipeline_config = config.get("trackers_pipeline", {})
+
+        # Pass Mediapipe a read-only RGB frame so it can avoid copying it
+        self.read_only_frames = trackers_pipeline_config.get("read_only_frames", True)
+
+        # Let the body pipeline's pose crop the regions the face and hand pipelines
+        # process, instead of running them on the full frame
+        self.roi_sharing = trackers_pipeline_config.get("roi_sharing", False)
+
+        # Run each pipeline's inference at its target rate; skipped frames reuse
+        # the last results, held as they are or extrapolated
+        self.inference_rates = trackers_pipeline_config.get("inference_rates", {})
+        self.inference_scheduler = InferenceScheduler(self.inference_rates)
+        self.skipped_frames = trackers_pipeline_config.get("skipped_frames", "hold")
+        if self.skipped_frames not in SKIPPED_FRAME_MODES:
+            raise ValueError(f"skipped_frames must be one of {SKIPPED_FRAME_MODES}.")
+        self.extrapolators = {name: LandmarkExtrapolator() for name in PIPELINE_CLASSES}
+
+        # Trade quality for speed while frames take longer than the frame budget
+        governor_config = config.get("quality_governor", {})
+        self.quality_governor = (
+            QualityGovernor(
+                frame_budget_ms=governor_config.get("frame_budget_ms", 33.0),
+                headroom_ratio=governor_config.get("headroom_ratio", 0.7),
+                window_size=governor_config.get("window_size", 30),
+            )
+            if governor_config.get("enabled", False)
+            else None
+        )
+        self.reduced_rates = governor_config.get("reduced_rates", REDUCED_RATES)
+        self.inference_scale = 1.0
+
+        # Skip inference of pipelines whose view of the scene has not changed
+        motion_gate_config = config.get("motion_gate", {})
+        self.motion_gate = MotionGate(
+            motion_gate_config.get("thresholds"),
+            motion_gate_config.get("max_skipped_frames", MAX_SKIPPED_FRAMES),
+        )
+
+        # Optionally run the enabled pipelines' inference on a thread pool
+        self.concurrent = trackers_pipeline_config.get("concurrent", False)
+        self.executor = (
+            ThreadPoolExecutor(
+                max_workers=len(PIPELINE_CLASSES), thread_name_prefix="tracker"
+            )
+            if self.concurrent
+            else None
+        )
+
+    def get_pipeline(self, name):
+        """
+        Returns a pipeline, creating it with its config values on first use.
+        Creating a pipeline is cheap; its Mediapipe model is only loaded once the
+        pipeline processes its first frame.
+        :param name: "hand", "body" or "face".
+        """
+        with self._pipelines_lock:
+            pipeline = self.pipelines.get(name)
+            if pipeline is None:
+                pipeline_class, config_section = PIPELINE_CLASSES[name]
+                pipeline = pipeline_class(**self._config[config_section])
+                self.pipelines[name] = pipeline
+                if self.quality_governor is not None:
+                    self.apply_pipeline_quality(name, pipeline)
+            return pipeline
+
+    @property
+    def hand_tracking_pipeline(self):
+        return self.get_pipeline("hand")
+
+    @property
+    def body_tracking_pipeline(self):
+        return self.get_pipeline("body")
+
+    @property
+    def face_tracking_pipeline(self):
+        return self.get_pipeline("face")
+
+    def enabled_pipelines(self):
+        # Enabled pipelines in drawing order, created on first use
+        return {
+            name: self.get_pipeline(name)
+            for name in PIPELINE_CLASSES
+            if self.pipeline_states[name]
+        }
+
+    def warm_up(self):
+        """
+        Loads the models of the enabled pipelines ahead of the first frame, e.g. while
+        the camera is still starting up.
+        """
+        for pipeline in self.enabled_pipelines().values():
+            pipeline.ensure_model()
+
+    def process_frame(self, raw_frame, overlay=None, timestamp=None):
+        """
+        Runs every enabled pipeline on the frame.
+        :param raw_frame: The BGR camera frame.
+        :param overlay: Overlay that records the pipelines' draw commands, or None
+                        to skip drawing entirely (headless mode).
+        :param timestamp: Time of the frame in seconds, such as its position in a
+                          video, that inference rates and extrapolation follow.
+                          Defaults to the current time.
+        :return: A dictionary of the Mediapipe results of each enabled pipeline.
+        """
+        # Skip the shared conversions entirely when every pipeline is disabled
+        if not any(self.pipeline_states.values()):
+            return {}
+
+        # The frame time budget is always measured in wall-clock time
+        start_time = time.perf_counter()
+        now = start_time if timestamp is None else timestamp
+        enabled_pipelines = self.enabled_pipelines()
+
+        # Only the pipelines due at their target rate, and whose scene changed
+        # enough, run inference on this frame; the others keep their results
+        with latency_monitor.stage("motion_gate"):
+            self.motion_gate.update(raw_frame)
+        due_pipelines = {}
+        gated_pipelines = set()
+        for name, pipeline in enabled_pipelines.items():
+            if not self.inference_scheduler.is_due(name, now):
+                continue
+            # A gated frame does not use up the pipeline's slot, so it runs as soon
+            # as the scene changes again
+            if self.motion_gate.should_run(name):
+                self.inference_scheduler.mark_run(name, now)
+                due_pipelines[name] = pipeline
+            else:
+                gated_pipelines.add(name)
+
+        # Results of a static scene need no extrapolation
+        updated_pipelines = set(gated_pipelines)
+        if due_pipelines:
+            updated_pipelines |= self.run_inference(
+                raw_frame, enabled_pipelines, due_pipelines, now
+            )
+
+        for name, pipeline in enabled_pipelines.items():
+            if name not in updated_pipelines:
+                self.update_landmarks(name, pipeline, name in due_pipelines, now)
+            # Gestures hold for a number of frames, so they advance on every frame
+            if name == "hand" and name not in due_pipelines:
+                pipeline.hold_gestures()
+
+        # Record drawing in a fixed order so the output does not depend on thread timing
+        if overlay is not None:
+            with latency_monitor.stage("record_draw"):
+                for pipeline in enabled_pipelines.values():
+                    pipeline.draw(overlay)
+
+        # Step the quality level once the frame time has left the budget
+        if self.quality_governor is not None:
+            settings = self.quality_governor.record(time.perf_counter() - start_time)
+            if settings is not None:
+                self.apply_quality(settings)
+
+        return {name: pipeline.results for name, pipeline in enabled_pipelines.items()}
+
+    def run_inference(self, raw_frame, enabled_pipelines, due_pipelines, now):
+        """
+        Runs inference of the due pipelines on the frame.
+        :return: Names of the pipelines whose landmarks were already updated.
+        """
+        # Build the data shared by all pipelines once per frame
+        with latency_monitor.stage("color_conversion"):
+            frame_context = FrameContext(
+                raw_frame,
+                read_only=self.read_only_frames,
+                inference_scale=self.inference_scale,
+            )
+
+        remaining_pipelines = due_pipelines
+        updated_pipelines = set()
+
+        # With ROI sharing the body runs first, so the others can process only the
+        # regions its pose points to
+        if self.roi_sharing and "body" in enabled_pipelines:
+            body_pipeline = enabled_pipelines["body"]
+            if "body" in due_pipelines:
+                self.process_pipeline("body", body_pipeline, frame_context)
+                self.update_landmarks("body", body_pipeline, True, now)
+                updated_pipelines.add("body")
+            frame_context.regions = body_pipeline.regions_of_interest(
+                frame_context.width, frame_context.height
+            )
+            remaining_pipelines = {
+                name: pipeline
+                for name, pipeline in due_pipelines.items()
+                if name != "body"
+            }
+
+        # Process the frame with each due pipeline, concurrently if configured
+        if self.executor is not None and len(remaining_pipelines) > 1:
+            futures = [
+                self.executor.submit(
+                    self.process_pipeline, name, pipeline, frame_context
+                )
+                for name, pipeline in remaining_pipelines.items()
+            ]
+            for future in futures:
+                future.result()
+        else:
+            for name, pipeline in remaining_pipelines.items():
+                self.process_pipeline(name, pipeline, frame_context)
+        return updated_pipelines
+
+    def apply_quality(self, settings):
+        """
+        Applies the settings of a quality level chosen by the quality governor.
+        :param settings: A settings dictionary from QUALITY_LADDER.
+        """
+        self.inference_scale = settings["inference_scale"]
+
+        # Cap every pipeline's rate at its reduced rate; 0 means every frame
+        rates = dict(self.inference_rates)
+        if settings["reduced_rates"]:
+            for name, reduced_rate in self.reduced_rates.items():
+                configured_rate = rates.get(name) or 0
+                rates[name] = (
+                    min(configured_rate, reduced_rate)
+                    if configured_rate
+                    else reduced_rate
+                )
+        self.inference_scheduler.set_rates(rates)
+
+        with self._pipelines_lock:
+            pipelines = dict(self.pipelines)
+        for name, pipeline in pipelines.items():
+            self.apply_pipeline_quality(name, pipeline)
+
+    def apply_pipeline_quality(self, name, pipeline):
+        # Apply the parts of the current quality level that live in a pipeline
+        settings = self.quality_governor.settings
+        if name == "body":
+            # A lighter model replaces the requested one in the background
+            pipeline.model_complexity_cap = settings["body_model_complexity"]
+        elif name == "face":
+            pipeline.cheap_drawing = settings["cheap_face_drawing"]
+
+    def process_pipeline(self, name, pipeline, frame_context):
+        # Run a single pipeline's inference, timing it as its own stage
+        with latency_monitor.stage(f"{name}.process"):
+            return pipeline.process(frame_context)
+
+    def update_landmarks(self, name, pipeline, ran_inference, now):
+        # Track landmark motion on inference frames and extrapolate it on skipped
+        # frames; held landmarks need no work
+        if self.skipped_frames != "extrapolate":
+            return
+        if ran_inference:
+            self.extrapolators[name].update(pipeline.landmark_lists(), now)
+        else:
+            self.extrapolators[name].predict(pipeline.landmark_lists(), now)
+
+    def get_frame_results(self):
+        """
+        Returns the last processed frame's landmarks, gestures and expressions of every
+        enabled pipeline as plain Python data.
+        """
+        return {
+            name: pipeline.get_frame_results()
+            for name, pipeline in self.enabled_pipelines().items()
+        }
+
+    def take_gesture_events(self):
+        """
+        Returns the gesture start and end events since the last call, or an empty
+        list if the hand pipeline is disabled.
+        """
+        if not self.pipeline_states["hand"]:
+            return []
+        return self.get_pipeline("hand").take_gesture_events()
 
     def update_pipeline_state(self, pipeline_name, state):
         # Enable or disable a specific pipeline
@@ -59,7 +320,10 @@ class TrackersPipeline:
             self.pipeline_states[pipeline_name] = state
 
     def stop(self):
-        # Stop all pipelines
-        self.hand_tracking_pipeline.stop()
-        self.body_tracking_pipeline.stop()
-        self.face_tracking_pipeline.stop()
+        # Stop all pipelines that were created
+        if self.executor is not None:
+            self.executor.shutdown(wait=True)
+        with self._pipelines_lock:
+            pipelines = list(self.pipelines.values())
+        for pipeline in pipelines:
+            pipeline.stop()